@@ -1,18 +1,111 @@
 # agent_backend.py
-from fastapi import FastAPI, Request
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from backend.baseAgent import BaseAgent
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from backend.baseAgent import BaseAgent, prewarm, shared_tools
+from backend.batch_planning import BATCH_MAX_TRIPS, BatchTrip, check_feasibility_many
 from backend.agent_prompts import AGENT_PROMPTS
+from backend.cache import MISSING, TTLCache, cache_stats, sweep_caches
+from backend.cancellation import CancelToken, JobCancelled, cancel_scope, check_cancelled
+from backend.executor import QueueFullError, agent_executor
+from backend import http_client
+from backend.feasibility import FeasibilityError, check_feasibility
+from backend.instrumentation import record_run
+from backend.itinerary_parser import iter_days, parse_summary
+from backend.itinerary_pipeline import ITINERARY_PIPELINE, PipelineError, TripRequest, plan_itinerary
+from backend.job_events import format_sse, job_events
+from backend.job_store import create_job_store
+from backend.metrics import Counter, render_prometheus
+from backend.plan_cache import create_plan_cache, plan_key
+from backend.poi_index import harvest_in_background
+from backend.route_geometry import pick_level, prefetch_route_geometry, route_geometry
 from backend.tools.geocoding_tool import GeocodingTool
 from backend.tools.directions_tool import DirectionsTool
 from backend.tools.linkup_tool import LinkupTool
 from backend.tools.ddgs_tool import DDGSTool
+from backend.tools.poi_tool import PoiCorridorTool
 
+import logging
 import os
+import time
 import uuid
-from fastapi import BackgroundTasks
+from typing import Optional
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+
+# Job statuses live in a bounded store (memory, or SQLite shared across workers)
+jobs = create_job_store()
+# Identical trip requests share one itinerary job (None when PLAN_CACHE=0)
+plan_cache = create_plan_cache(jobs)
+
+JOB_SWEEP_INTERVAL = float(os.getenv("JOB_SWEEP_INTERVAL", "300"))
+# "fast": deterministic Mapbox check (agent fallback on API errors); "agent": LLM sanity check
+FEASIBILITY_MODE = os.getenv("FEASIBILITY_MODE", "fast").lower()
+# Ask the LLM for short planning notes on top of the fast verdict
+FEASIBILITY_NOTES = os.getenv("FEASIBILITY_NOTES", "0") == "1"
+# Seconds between keep-alives on /job_events; each one also re-reads the job store
+JOB_EVENTS_RECHECK = float(os.getenv("JOB_EVENTS_RECHECK", "15"))
+# Start the itinerary job together with the feasibility check instead of after it;
+# the job is cancelled at its next iteration boundary if the trip is not feasible
+SPECULATIVE_ITINERARY = os.getenv("SPECULATIVE_ITINERARY", "0") == "1"
+# Build the model client and tools and open upstream connections before serving
+AGENT_PREWARM = os.getenv("AGENT_PREWARM", "1") == "1"
+
+
+# Itinerary jobs from /plan_trips running at once across all batches; the rest
+# of the executor stays free for interactive requests
+BATCH_MAX_CONCURRENT = int(os.getenv("BATCH_MAX_CONCURRENT", str(max(1, agent_executor.max_workers // 2))))
+_batch_slots = asyncio.Semaphore(BATCH_MAX_CONCURRENT)
+# Seconds between attempts to queue a batch job while the executor is full
+BATCH_RETRY_INTERVAL = float(os.getenv("BATCH_RETRY_INTERVAL", "1"))
+# batch id -> per-trip results, kept as long as the jobs they point at; stored next
+# to a SQLite job store by default so every worker can answer /plan_trips/{id}
+batches = TTLCache(
+    "batches",
+    max_entries=1000,
+    ttl=jobs.ttl,
+    path=os.getenv("BATCH_STORE_PATH") or getattr(jobs, "path", None)
+)
+
+speculative_runs = Counter(
+    "speculative_itinerary_total",
+    "Itinerary jobs started alongside the feasibility check, by outcome: kept or cancelled.",
+    ["kind", "outcome"]
+)
+speculative_seconds = Counter(
+    "speculative_itinerary_seconds_total",
+    "Speculation payoff: feasibility-check seconds the kept jobs ran ahead (saved), and LLM/tool seconds spent by cancelled jobs (wasted).",
+    ["kind", "outcome"]
+)
+
+
+async def _sweep_jobs():
+    # Expired jobs, and expired or surplus entries in every cache's SQLite tier
+    while True:
+        await asyncio.sleep(JOB_SWEEP_INTERVAL)
+        await asyncio.to_thread(jobs.sweep)
+        await asyncio.to_thread(sweep_caches)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if AGENT_PREWARM:
+        await asyncio.to_thread(
+            prewarm,
+            (GeocodingTool, DirectionsTool, DDGSTool, PoiCorridorTool),
+            [http_client.MAPBOX_API_BASE]
+        )
+    sweeper = asyncio.create_task(_sweep_jobs())
+    yield
+    sweeper.cancel()
+    agent_executor.shutdown(wait=False)
+    jobs.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow CORS for frontend (adjust origins as needed)
 app.add_middleware(
@@ -23,14 +116,245 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
-# Each API endpoint will create its own BaseAgent instance to avoid
-# sharing state between requests.
+# Watcher tasks that enforce the job timeout; kept referenced until done
+_job_watchers = set()
+
+# Each run creates its own BaseAgent (just the conversation state); the model
+# client and tools inside are process-wide singletons. All agent runs go
+# through agent_executor so the event loop only awaits futures.
+
+
+def _busy_error() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many trip plans are in progress. Please try again shortly.",
+        headers={"Retry-After": "30"}
+    )
+
+
+def _finish_job(job_id, status, result):
+    # Only processing jobs are updated, so a job that already timed out keeps its error status
+    if jobs.finish(job_id, status, result):
+        job_events.publish(job_id, "status", {"status": status, "result": result})
+
+
+def _step_publisher(job_id):
+    return lambda step: job_events.publish(job_id, "step", step)
+
+
+def _day_publisher(job_id):
+    return lambda day: job_events.publish(job_id, "day", day.to_dict())
+
+
+def _itinerary_result(recorder, answer=None, itinerary=None, preferences=()):
+    """Job result for a pipeline itinerary, or for a single agent's answer.
+
+    An answer is parsed into days here. Only the pipeline publishes 'day'
+    events, each when that day's research finishes; a single agent's days
+    arrive all at once with its final answer, so they go out with the final
+    status event instead. The raw answer is only kept when nothing could be
+    parsed, so clients can still show it as text.
+    """
+    if itinerary is None:
+        itinerary = {"days": [day.to_dict() for day in iter_days(answer)], "summary": parse_summary(answer)}
+    # Map lines are fetched off the agent thread so they are ready when the client asks
+    prefetch_route_geometry(day["route_coordinates"] for day in itinerary["days"])
+    # Later trips along this route find these places locally instead of on the web
+    harvest_in_background(itinerary["days"], preferences)
+    result = {"itinerary": itinerary, "metrics": recorder.summary()}
+    if not itinerary["days"]:
+        result["answer"] = answer
+    return result
+
+
+def _run_pipeline(job_id, trip):
+    # Parallel per-day planning; None means the single itinerary agent should plan the trip
+    if not ITINERARY_PIPELINE or trip is None:
+        return None
+    try:
+        return plan_itinerary(trip, on_step=_step_publisher(job_id), on_day=_day_publisher(job_id))
+    except PipelineError:
+        return None
+
+
+def _trip_request(kind, from_loc, to_loc, duration, driving_hours, hurry="", preferences=None):
+    try:
+        days = int(float(duration))
+    except (TypeError, ValueError):
+        return None
+    return TripRequest(kind, from_loc, to_loc, days, driving_hours, hurry, list(preferences or []))
+
+
+def _cancelled_job(job_id, kind, recorder, reason):
+    # Work done before the cancellation reached an iteration boundary is wasted
+    totals = recorder.summary()["totals"]
+    speculative_seconds.inc(sum(total["ms"] for total in totals.values()) / 1000, kind=kind, outcome="wasted")
+    _finish_job(job_id, "cancelled", str(reason))
+
+
+async def _watch_job(job_id, future):
+    try:
+        await agent_executor.wait(future)
+    except asyncio.TimeoutError:
+        _finish_job(job_id, "error", "Itinerary generation timed out.")
+    except Exception as e:
+        _finish_job(job_id, "error", str(e))
+
+
+async def _run_batch_job(job_id, job_fn, *job_args):
+    # Waits for a slot of the shared batch budget, then (holding it) for room on
+    # the executor, which single-trip requests may have filled
+    async with _batch_slots:
+        deadline = time.monotonic() + agent_executor.timeout
+        while True:
+            try:
+                future = agent_executor.submit(job_fn, job_id, *job_args)
+                break
+            except QueueFullError:
+                if time.monotonic() >= deadline:
+                    _finish_job(job_id, "error", _busy_error().detail)
+                    return
+                await asyncio.sleep(BATCH_RETRY_INTERVAL)
+        await _watch_job(job_id, future)
+
+
+def _reuse_job(plan):
+    return plan_cache.lookup(plan) if plan_cache is not None else None
+
+
+def start_job(job_fn, *job_args, plan=None):
+    """Queue an itinerary job on the agent executor and return its job id.
+
+    When a plan key is given, the job is registered in the plan cache so
+    identical requests reuse it.
+    """
+    job_id = str(uuid.uuid4())
+    jobs.create(job_id)
+    try:
+        future = agent_executor.submit(job_fn, job_id, *job_args)
+    except QueueFullError:
+        jobs.delete(job_id)
+        raise _busy_error()
+    task = asyncio.create_task(_watch_job(job_id, future))
+    _job_watchers.add(task)
+    task.add_done_callback(_job_watchers.discard)
+    if plan is not None and plan_cache is not None:
+        plan_cache.remember(plan, job_id)
+    return job_id
+
+
+def start_batch_job(job_fn, *job_args, plan=None):
+    """Like start_job, but the job waits for the batch concurrency budget and for executor room instead of failing when either is busy.
+
+    A job that cannot be queued within the job timeout ends with an error status.
+    """
+    job_id = str(uuid.uuid4())
+    jobs.create(job_id)
+    task = asyncio.create_task(_run_batch_job(job_id, job_fn, *job_args))
+    _job_watchers.add(task)
+    task.add_done_callback(_job_watchers.discard)
+    if plan is not None and plan_cache is not None:
+        plan_cache.remember(plan, job_id)
+    return job_id
+
+
+def _utility_query(from_loc, to_loc, duration, driving_hours, hurry):
+    return f"I am planning a road trip from {from_loc} to {to_loc}. The trip will last {duration} days, and I plan to drive about {driving_hours} hours each day. Regarding hurry: {hurry}."
+
+
+def _relaxed_query(from_loc, to_loc, duration, driving_hours, preferences):
+    preferences_str = ", ".join(preferences) if preferences else "general interests"
+    return f"I am planning a relaxed road trip from {from_loc} to {to_loc}. The trip will last {duration} days, and I plan to drive about {driving_hours} hours each day. My preferences are: {preferences_str}."
+
+
+def run_sanity_check(query):
+    with record_run("sanity_check"):
+        local_agent = BaseAgent(
+            custom_system_prompt=AGENT_PROMPTS["route_sanity_check"],
+            tools=shared_tools(GeocodingTool, DirectionsTool),
+            max_iterations=10
+        )
+        return local_agent.agent.run(query)
+
+
+def run_feasibility_notes(from_loc, to_loc, duration, driving_hours, verdict):
+    with record_run("feasibility_notes"):
+        local_agent = BaseAgent(
+            custom_system_prompt=AGENT_PROMPTS["route_feasibility_notes"],
+            tools=[],
+            max_iterations=2
+        )
+        notes_query = f"Road trip from {from_loc} to {to_loc} over {duration} days, driving about {driving_hours} hours each day. Result: {verdict.answer}"
+        return local_agent.agent.run(notes_query).final_answer
+
+
+async def _run_agent(fn, *args):
+    try:
+        return await agent_executor.run(fn, *args)
+    except QueueFullError:
+        raise _busy_error()
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Route feasibility check timed out.")
+
+
+async def plan_speculatively(kind, plan, job_fn, query, trip, from_loc, to_loc, duration, driving_hours):
+    """Run the itinerary job and the feasibility check at the same time.
+
+    The job is registered in the plan cache only once the trip is known to be
+    feasible, so no other request can join a job that may still be called off.
+    Returns the same response shapes as the sequential path.
+    """
+    token = CancelToken()
+    # The executor copies the context, so the job and its day agents see the token
+    with cancel_scope(token):
+        job_id = start_job(job_fn, query, trip)
+    started = time.perf_counter()
+    try:
+        sanity = await sanity_check(from_loc, to_loc, duration, driving_hours)
+    except BaseException:
+        token.cancel("The feasibility check failed.")
+        raise
+    if not sanity["feasible"]:
+        token.cancel("The route is not feasible.")
+        speculative_runs.inc(kind=kind, outcome="cancelled")
+        return {"answer": sanity["answer"], "feasible": False, "verdict": sanity["verdict"]}
+
+    # Another request may have started the same plan while this one was checked
+    existing = _reuse_job(plan)
+    if existing is not None:
+        token.cancel("An identical trip plan is already in progress.")
+        speculative_runs.inc(kind=kind, outcome="cancelled")
+        return {"job_id": existing, "feasible": True}
+    if plan_cache is not None:
+        plan_cache.remember(plan, job_id)
+    speculative_runs.inc(kind=kind, outcome="kept")
+    speculative_seconds.inc(time.perf_counter() - started, kind=kind, outcome="saved")
+    return {"job_id": job_id, "feasible": True}
 
-# Global dict to store job statuses (in production, use a database)
-jobs = {}
 
-# Each API endpoint will create its own BaseAgent instance to avoid
-# sharing state between requests.
+async def sanity_check(from_loc, to_loc, duration, driving_hours):
+    """Return {"feasible": bool, "answer": str, "verdict": dict or None} for the trip."""
+    if FEASIBILITY_MODE == "fast":
+        try:
+            # Two short, cached Mapbox calls; off the event loop but outside the agent pool
+            verdict = await asyncio.to_thread(check_feasibility, from_loc, to_loc, duration, driving_hours)
+        except FeasibilityError:
+            verdict = None
+        if verdict is not None:
+            answer = verdict.answer
+            if FEASIBILITY_NOTES:
+                # The notes are optional; the verdict stands without them
+                try:
+                    notes = await _run_agent(run_feasibility_notes, from_loc, to_loc, duration, driving_hours, verdict)
+                    answer = f"{answer}\n\n{notes}"
+                except Exception:
+                    logger.warning("Feasibility notes failed; returning the verdict without them.", exc_info=True)
+            return {"feasible": verdict.feasible, "answer": answer, "verdict": verdict.to_dict()}
+
+    sanity_query = f"I am planning a road trip from {from_loc} to {to_loc}. The trip will last {duration} days, and I plan to drive about {driving_hours} hours each day. Please provide any additional notes or context that would help in planning this route."
+    sanity_response = await _run_agent(run_sanity_check, sanity_query)
+    feasible = "The route is not feasible" not in sanity_response.final_answer
+    return {"feasible": feasible, "answer": sanity_response.final_answer, "verdict": None}
 
 
 @app.post("/validate_password")
@@ -45,7 +369,7 @@ async def validate_password(request: Request):
     return {"success": False}
 
 @app.post("/plan_trip")
-async def plan_trip(request: Request, background_tasks: BackgroundTasks):
+async def plan_trip(request: Request):
     data = await request.json()
     trip_data = data.get("trip", {})
     from_loc = trip_data.get("from", "")
@@ -54,38 +378,51 @@ async def plan_trip(request: Request, background_tasks: BackgroundTasks):
     driving_hours = trip_data.get("drivingHoursPerDay", "")
     hurry = trip_data.get("routePreference", "")
 
+    # Identical trips already planned or in progress reuse that job
+    plan = plan_key("utility", from_loc, to_loc, duration, driving_hours, [hurry])
+    job_id = _reuse_job(plan)
+    if job_id is not None:
+        return {"job_id": job_id, "feasible": True}
+
+    itinerary_query = _utility_query(from_loc, to_loc, duration, driving_hours, hurry)
+    trip = _trip_request("utility", from_loc, to_loc, duration, driving_hours, hurry=hurry)
+    if SPECULATIVE_ITINERARY:
+        return await plan_speculatively("utility", plan, process_utility_itinerary, itinerary_query, trip,
+                                        from_loc, to_loc, duration, driving_hours)
+
     # First, run sanity check
-    sanity_query = f"I am planning a road trip from {from_loc} to {to_loc}. The trip will last {duration} days, and I plan to drive about {driving_hours} hours each day. Please provide any additional notes or context that would help in planning this route."
-    local_agent = BaseAgent(
-        custom_system_prompt=AGENT_PROMPTS["route_sanity_check"],
-        tools=[GeocodingTool(), DirectionsTool()],
-        max_iterations=10
-    )
-    sanity_response = local_agent.agent.run(sanity_query)
-    if "The route is not feasible" in sanity_response.final_answer:
-        return {"answer": sanity_response.final_answer, "feasible": False}
+    sanity = await sanity_check(from_loc, to_loc, duration, driving_hours)
+    if not sanity["feasible"]:
+        return {"answer": sanity["answer"], "feasible": False, "verdict": sanity["verdict"]}
 
     # If feasible, create itinerary
-    itinerary_query = f"I am planning a road trip from {from_loc} to {to_loc}. The trip will last {duration} days, and I plan to drive about {driving_hours} hours each day. Regarding hurry: {hurry}."
-    job_id = str(uuid.uuid4())
-    jobs[job_id] = {"status": "processing", "result": None}
-    background_tasks.add_task(process_utility_itinerary, job_id, itinerary_query)
+    # Another request may have started the same plan while this one was checked
+    job_id = _reuse_job(plan) or start_job(process_utility_itinerary, itinerary_query, trip, plan=plan)
     return {"job_id": job_id, "feasible": True}
 
-def process_utility_itinerary(job_id, query):
+def process_utility_itinerary(job_id, query, trip=None):
     try:
-        local_agent = BaseAgent(
-            custom_system_prompt=AGENT_PROMPTS["utility_focused_itinerary"],
-            tools=[GeocodingTool(), DirectionsTool(), DDGSTool()],
-            max_iterations=30
-        )
-        response = local_agent.agent.run(query)
-        jobs[job_id] = {"status": "completed", "result": {"answer": response.final_answer}}
+        with record_run("utility_itinerary") as recorder:
+            itinerary = _run_pipeline(job_id, trip)
+            answer = None
+            if itinerary is None:
+                local_agent = BaseAgent(
+                    custom_system_prompt=AGENT_PROMPTS["utility_focused_itinerary"],
+                    tools=shared_tools(GeocodingTool, DirectionsTool, DDGSTool),
+                    max_iterations=30,
+                    on_step=_step_publisher(job_id)
+                )
+                answer = local_agent.agent.run(query).final_answer
+            # A cancel that arrived during the last LLM call still makes this wasted work
+            check_cancelled()
+        _finish_job(job_id, "completed", _itinerary_result(recorder, answer, itinerary))
+    except JobCancelled as e:
+        _cancelled_job(job_id, "utility", recorder, e)
     except Exception as e:
-        jobs[job_id] = {"status": "error", "result": str(e)}
+        _finish_job(job_id, "error", str(e))
 
 @app.post("/plan_relaxed_trip")
-async def plan_relaxed_trip(request: Request, background_tasks: BackgroundTasks):
+async def plan_relaxed_trip(request: Request):
     data = await request.json()
     trip_data = data.get("trip", {})
     from_loc = trip_data.get("from", "")
@@ -94,39 +431,214 @@ async def plan_relaxed_trip(request: Request, background_tasks: BackgroundTasks)
     driving_hours = trip_data.get("drivingHoursPerDay", "")
     preferences = trip_data.get("preferences", [])
 
+    # Identical trips already planned or in progress reuse that job
+    plan = plan_key("relaxed", from_loc, to_loc, duration, driving_hours, preferences)
+    job_id = _reuse_job(plan)
+    if job_id is not None:
+        return {"job_id": job_id, "feasible": True}
+
+    itinerary_query = _relaxed_query(from_loc, to_loc, duration, driving_hours, preferences)
+    trip = _trip_request("relaxed", from_loc, to_loc, duration, driving_hours, preferences=preferences)
+    if SPECULATIVE_ITINERARY:
+        return await plan_speculatively("relaxed", plan, process_relaxed_itinerary, itinerary_query, trip,
+                                        from_loc, to_loc, duration, driving_hours)
+
     # First, run sanity check
-    sanity_query = f"I am planning a road trip from {from_loc} to {to_loc}. The trip will last {duration} days, and I plan to drive about {driving_hours} hours each day. Please provide any additional notes or context that would help in planning this route."
-    local_agent = BaseAgent(
-        custom_system_prompt=AGENT_PROMPTS["route_sanity_check"],
-        tools=[GeocodingTool(), DirectionsTool()],
-        max_iterations=10
-    )
-    sanity_response = local_agent.agent.run(sanity_query)
-    if "The route is not feasible" in sanity_response.final_answer:
-        return {"answer": sanity_response.final_answer, "feasible": False}
+    sanity = await sanity_check(from_loc, to_loc, duration, driving_hours)
+    if not sanity["feasible"]:
+        return {"answer": sanity["answer"], "feasible": False, "verdict": sanity["verdict"]}
 
     # If feasible, create itinerary
-    preferences_str = ", ".join(preferences) if preferences else "general interests"
-    itinerary_query = f"I am planning a relaxed road trip from {from_loc} to {to_loc}. The trip will last {duration} days, and I plan to drive about {driving_hours} hours each day. My preferences are: {preferences_str}."
-    job_id = str(uuid.uuid4())
-    jobs[job_id] = {"status": "processing", "result": None}
-    background_tasks.add_task(process_relaxed_itinerary, job_id, itinerary_query)
+    # Another request may have started the same plan while this one was checked
+    job_id = _reuse_job(plan) or start_job(process_relaxed_itinerary, itinerary_query, trip, plan=plan)
     return {"job_id": job_id, "feasible": True}
 
-def process_relaxed_itinerary(job_id, query):
+def process_relaxed_itinerary(job_id, query, trip=None):
     try:
-        local_agent = BaseAgent(
-            custom_system_prompt=AGENT_PROMPTS["relaxed_itinerary"],
-            tools=[GeocodingTool(), DirectionsTool(), DDGSTool()],
-            max_iterations=30
-        )
-        response = local_agent.agent.run(query)
-        jobs[job_id] = {"status": "completed", "result": {"answer": response.final_answer}}
+        with record_run("relaxed_itinerary") as recorder:
+            itinerary = _run_pipeline(job_id, trip)
+            answer = None
+            if itinerary is None:
+                local_agent = BaseAgent(
+                    custom_system_prompt=AGENT_PROMPTS["relaxed_itinerary"],
+                    tools=shared_tools(GeocodingTool, DirectionsTool, DDGSTool, PoiCorridorTool),
+                    max_iterations=30,
+                    on_step=_step_publisher(job_id)
+                )
+                answer = local_agent.agent.run(query).final_answer
+            # A cancel that arrived during the last LLM call still makes this wasted work
+            check_cancelled()
+        preferences = trip.preferences if trip is not None else ()
+        _finish_job(job_id, "completed", _itinerary_result(recorder, answer, itinerary, preferences))
+    except JobCancelled as e:
+        _cancelled_job(job_id, "relaxed", recorder, e)
     except Exception as e:
-        jobs[job_id] = {"status": "error", "result": str(e)}
+        _finish_job(job_id, "error", str(e))
+
+def _queue_batch_trip(trip_data):
+    # Identical trips (in this batch or earlier) share one job, as on the single-trip endpoints
+    from_loc = trip_data.get("from", "")
+    to_loc = trip_data.get("to", "")
+    duration = trip_data.get("duration", "")
+    driving_hours = trip_data.get("drivingHoursPerDay", "")
+    if trip_data.get("kind") == "relaxed":
+        preferences = trip_data.get("preferences", [])
+        plan = plan_key("relaxed", from_loc, to_loc, duration, driving_hours, preferences)
+        query = _relaxed_query(from_loc, to_loc, duration, driving_hours, preferences)
+        trip = _trip_request("relaxed", from_loc, to_loc, duration, driving_hours, preferences=preferences)
+        job_fn = process_relaxed_itinerary
+    else:
+        hurry = trip_data.get("routePreference", "")
+        plan = plan_key("utility", from_loc, to_loc, duration, driving_hours, [hurry])
+        query = _utility_query(from_loc, to_loc, duration, driving_hours, hurry)
+        trip = _trip_request("utility", from_loc, to_loc, duration, driving_hours, hurry=hurry)
+        job_fn = process_utility_itinerary
+    return _reuse_job(plan) or start_batch_job(job_fn, query, trip, plan=plan)
+
+
+@app.post("/plan_trips")
+async def plan_trips(request: Request):
+    """Check and plan many trips at once; returns a batch id and a job id per feasible trip.
+
+    Each trip takes the fields of /plan_trip, plus "kind": "utility"
+    (default) or "relaxed" with "preferences". Feasibility for the whole
+    batch comes from one geocoding pass and Mapbox Matrix calls; only
+    feasible trips get itinerary jobs, which share BATCH_MAX_CONCURRENT
+    executor workers.
+    """
+    data = await request.json()
+    trips_data = data.get("trips")
+    if not isinstance(trips_data, list) or not trips_data or not all(isinstance(t, dict) for t in trips_data):
+        raise HTTPException(status_code=400, detail="trips must be a non-empty array of trip objects.")
+    if len(trips_data) > BATCH_MAX_TRIPS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_TRIPS} trips can be planned in one batch.")
+
+    trips = [
+        BatchTrip(t.get("from", ""), t.get("to", ""), t.get("duration", ""), t.get("drivingHoursPerDay", ""))
+        for t in trips_data
+    ]
+    try:
+        verdicts = await asyncio.to_thread(check_feasibility_many, trips)
+    except FeasibilityError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    results = []
+    for trip_data, trip, verdict in zip(trips_data, trips, verdicts):
+        entry = {"from": trip.from_loc, "to": trip.to_loc, "feasible": verdict.feasible, "answer": verdict.answer, "verdict": verdict.to_dict()}
+        if verdict.feasible:
+            entry["job_id"] = _queue_batch_trip(trip_data)
+        results.append(entry)
+    batch_id = str(uuid.uuid4())
+    batches.set(batch_id, results)
+    return {"batch_id": batch_id, "trips": results}
+
+
+@app.get("/plan_trips/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """The batch's trips with the current status of each itinerary job."""
+    results = batches.get(batch_id)
+    if results is MISSING:
+        return {"status": "not_found"}
+    trips = []
+    for entry in results:
+        job = jobs.get(entry["job_id"]) if "job_id" in entry else None
+        if "job_id" in entry:
+            status = job["status"] if job is not None else "not_found"
+        else:
+            status = "error" if entry["verdict"].get("error") else "infeasible"
+        trips.append(dict(entry, status=status))
+    return {"batch_id": batch_id, "trips": trips}
+
+
+def _job_day(job_id: str, day: int) -> Optional[dict]:
+    # The given day of a finished job's itinerary, or None
+    job = jobs.get(job_id)
+    if job is None or job.get("status") != "completed":
+        return None
+    itinerary = (job.get("result") or {}).get("itinerary") or {}
+    return next((d for d in itinerary.get("days", []) if d.get("day") == day), None)
+
+
+@app.get("/route_geometry")
+async def get_route_geometry(job_id: str, day: int, zoom: Optional[int] = None):
+    """Simplified route line for one day of a finished job, as encoded polylines.
+
+    Only the Route Coordinates of days this server planned are looked up, so
+    the endpoint cannot be used to route arbitrary points with our Mapbox
+    token. Without a zoom every precomputed level is returned; with one, only
+    the most detailed level suited to it.
+    """
+    access_token = os.getenv("MAPBOX_ACCESS_TOKEN")
+    if not access_token:
+        raise HTTPException(status_code=503, detail="MAPBOX_ACCESS_TOKEN environment variable not set.")
+    itinerary_day = _job_day(job_id, day)
+    if itinerary_day is None:
+        raise HTTPException(status_code=404, detail="No such day in a finished job.")
+    try:
+        waypoints = [tuple(point) for point in itinerary_day.get("route_coordinates") or []]
+        geometry = await asyncio.to_thread(route_geometry, waypoints, access_token)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except http_client.HTTP_ERRORS as e:
+        raise HTTPException(status_code=502, detail=f"Error calling Mapbox API: {e}")
+    if geometry is None:
+        raise HTTPException(status_code=404, detail="No route found for this day.")
+    return pick_level(geometry, zoom)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus exposition of HTTP, LLM, tool, cache and executor metrics."""
+    return render_prometheus()
+
+@app.get("/cache_stats")
+async def get_cache_stats():
+    return cache_stats()
 
 @app.get("/job_status/{job_id}")
 async def get_job_status(job_id: str):
-    if job_id not in jobs:
+    job = jobs.get(job_id)
+    if job is None:
         return {"status": "not_found"}
-    return jobs[job_id]
\ No newline at end of file
+    return job
+
+
+async def _job_event_stream(job_id, request):
+    # Subscribe before reading the store so a completion in between is not missed
+    queue = job_events.subscribe(job_id)
+    try:
+        job = jobs.get(job_id)
+        if job is None:
+            yield format_sse("status", {"status": "not_found"})
+            return
+        yield format_sse("status", job)
+        while job["status"] == "processing":
+            try:
+                event, data = await asyncio.wait_for(queue.get(), timeout=JOB_EVENTS_RECHECK)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                # The job may be running on another worker process
+                job = jobs.get(job_id) or {"status": "not_found"}
+                if job["status"] == "processing":
+                    yield ": keep-alive\n\n"
+                else:
+                    yield format_sse("status", job)
+                continue
+            yield format_sse(event, data)
+            if event == "status":
+                job = data
+    finally:
+        job_events.unsubscribe(job_id, queue)
+
+@app.get("/job_events/{job_id}")
+async def stream_job_events(job_id: str, request: Request):
+    """Server-Sent Events stream of a job's tool-call steps and status changes.
+
+    The stream ends after the final "status" event; /job_status remains
+    available for clients that cannot use EventSource.
+    """
+    return StreamingResponse(
+        _job_event_stream(job_id, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,45 +1,154 @@
 # backend/baseAgent.py
-# Small wrapper that creates a model, tools list and ReactAgent.
+# Small wrapper that pairs shared model clients and tools with a per-run ReactAgent.
 from agentpro import ReactAgent, create_model
+from backend import http_client
+from backend.cancellation import check_cancelled
+from backend.context_window import BoundedContextModel, compact_observation
+from backend.instrumentation import InstrumentedModel, tool_span
+from backend.llm_cache import cached_model
+from backend.tools.async_tool import PARALLEL_ACTION, ParallelToolCalls
+import logging
 import os
-from typing import Optional, Sequence
+import threading
+from typing import Callable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDER = "openai"
+DEFAULT_MODEL = "gpt-5-nano"
+# Give agents with several tools the run_tools_in_parallel action
+AGENT_PARALLEL_TOOLS = os.getenv("AGENT_PARALLEL_TOOLS", "1") == "1"
+
+# Model clients and tools are built once per process and shared by every agent;
+# they hold connection pools and no conversation state
+_models = {}
+_tools = {}
+_shared_lock = threading.Lock()
+
+
+def shared_model(provider: str = DEFAULT_PROVIDER, model_name: str = DEFAULT_MODEL, api_key: Optional[str] = None) -> InstrumentedModel:
+    """The process-wide (instrumented) model client for this provider, model and key."""
+    if api_key is None:
+        api_key = os.getenv("OPENAI_API_KEY", None)
+    key = (provider, model_name, api_key)
+    model = _models.get(key)
+    if model is None:
+        with _shared_lock:
+            model = _models.get(key)
+            if model is None:
+                # Wrapped so every completion is timed and token-counted, and
+                # (with LLM_CACHE set) identical requests are answered from the cache
+                model = _models[key] = InstrumentedModel(
+                    cached_model(create_model(provider=provider, model_name=model_name, api_key=api_key), model_name),
+                    model_name
+                )
+    return model
+
+
+def reset_shared_models() -> None:
+    """Drop the shared model clients, so the next shared_model() call builds new ones."""
+    with _shared_lock:
+        _models.clear()
+
+
+def shared_tools(*tool_classes) -> List:
+    """One process-wide instance per tool class, in the order given."""
+    tools = []
+    for tool_class in tool_classes:
+        tool = _tools.get(tool_class)
+        if tool is None:
+            with _shared_lock:
+                tool = _tools.get(tool_class)
+                if tool is None:
+                    tool = _tools[tool_class] = tool_class()
+        tools.append(tool)
+    return tools
+
+
+def prewarm(tool_classes: Sequence = (), hosts: Sequence[str] = ()) -> None:
+    """Build the default model client and the given tools, and open keep-alive connections to hosts.
+
+    Called once at startup so the first requests skip client construction
+    and TLS handshakes. Best effort: a failure (e.g. a missing API key) is
+    logged and the app still starts; nothing is cached for the failed part,
+    so the first request that needs it builds it again and reports the error.
+    """
+    for label, warm in (
+        ("model client", shared_model),
+        ("tools", lambda: shared_tools(*tool_classes)),
+        ("connections", lambda: http_client.warm(hosts))
+    ):
+        try:
+            warm()
+        except Exception:
+            logger.warning("Prewarming the %s failed; it will be built on first use.", label, exc_info=True)
+
+
+class StepReportingReactAgent(ReactAgent):
+    """ReactAgent that times each tool call and reports it to an optional callback.
+
+    The callback receives a dict such as
+    {"type": "tool_call", "tool": "geocode_addresses", "input": [...]}
+    before the tool runs, which lets job streams show progress. Results are
+    capped (see compact_observation) before they enter the conversation.
+    """
+
+    def __init__(self, *args, on_step: Optional[Callable[[dict], None]] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.on_step = on_step
+
+    def execute_tool(self, action):
+        check_cancelled()
+        # Parallel calls report each of their actions themselves
+        if self.on_step is not None and action.action_type != PARALLEL_ACTION:
+            self.on_step({"type": "tool_call", "tool": action.action_type, "input": action.input})
+        with tool_span(action.action_type, action.input) as span:
+            observation = super().execute_tool(action)
+            span["output"] = observation.result
+            # Tools report failures as "Error..." strings rather than raising
+            if str(observation.result).startswith("Error"):
+                span["error"] = str(observation.result)[:200]
+        observation.result = compact_observation(observation.result)
+        return observation
 
 
 class BaseAgent:
     """Container for a model, tools list and a ReactAgent instance.
 
-    This class instantiates the underlying model and ReactAgent so callers
-    can create multiple independent agents if needed. It also supports
-    a module-level default instance for backwards compatibility.
+    The model client is the shared one from shared_model(); only the
+    ReactAgent, which holds the conversation, and a BoundedContextModel view
+    that keeps its prompts within AGENT_CONTEXT_TOKENS are created per
+    instance, so callers can create one agent per run cheaply.
 
     Args:
         provider: model provider name (default: "openai").
-        model_name: model identifier (default: "gpt-4.1-nano").
+        model_name: model identifier (default: "gpt-5-nano").
         api_key: API key string. If None, pulls from OPENAI_API_KEY env var.
-        tools: optional sequence of tools to pass to ReactAgent.
+        tools: optional sequence of tools to pass to ReactAgent (see shared_tools).
+        on_step: optional callback invoked with a dict for every tool call.
     """
 
     def __init__(
         self,
-        provider: str = "openai",
-        model_name: str = "gpt-5-nano",
+        provider: str = DEFAULT_PROVIDER,
+        model_name: str = DEFAULT_MODEL,
         api_key: Optional[str] = None,
         tools: Optional[Sequence] = None,
         custom_system_prompt: Optional[str] = None,
-        max_iterations: Optional[int] = 20
+        max_iterations: Optional[int] = 20,
+        on_step: Optional[Callable[[dict], None]] = None
     ) -> None:
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY", None)
-        self.model = create_model(provider=provider,
-                                  model_name=model_name,
-                                  api_key=api_key
-                                  )
+        self.model = BoundedContextModel(shared_model(provider, model_name, api_key))
         # Ensure tools is a list for mutability if callers want to append
         self.tools = list(tools) if tools is not None else []
-        self.agent = ReactAgent(model=self.model,
-                                tools=self.tools,
-                                max_iterations=max_iterations,
-                                custom_system_prompt=custom_system_prompt)
+        if AGENT_PARALLEL_TOOLS and len(self.tools) > 1:
+            # Built per agent: it reports to this run's on_step
+            self.tools.append(ParallelToolCalls(tools={tool.action_type: tool for tool in self.tools}, on_step=on_step))
+        self.agent = StepReportingReactAgent(model=self.model,
+                                             tools=self.tools,
+                                             max_iterations=max_iterations,
+                                             custom_system_prompt=custom_system_prompt,
+                                             on_step=on_step)
 
 
-__all__ = ["BaseAgent"]
+__all__ = ["BaseAgent", "StepReportingReactAgent", "prewarm", "reset_shared_models", "shared_model", "shared_tools"]
@@ -0,0 +1,182 @@
+# backend/batch_planning.py
+# Feasibility for many trips at once: one geocoding pass over the distinct
+# endpoints, then Mapbox Matrix calls for the origin/destination pairs.
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from backend import http_client
+from backend.cache import MISSING
+from backend.feasibility import FeasibilityError, FeasibilityVerdict, fits, positive_number, route_verdict
+from backend.metrics import Counter
+from backend.tools.directions_tool import DIRECTIONS_COORD_PRECISION, cached_leg, remember_leg
+from backend.tools.geocoding_tool import geocode_many
+
+BATCH_MAX_TRIPS = int(os.getenv("BATCH_MAX_TRIPS", "100"))
+MATRIX_MAX_COORDINATES = 25  # Mapbox Matrix limit for the driving profile
+
+matrix_pairs = Counter(
+    "batch_matrix_pairs_total",
+    "Origin/destination pairs needed by batch feasibility checks, by source: cached leg or Matrix API.",
+    ["source"]
+)
+
+
+@dataclass
+class BatchTrip:
+    from_loc: str
+    to_loc: str
+    duration: Any
+    driving_hours: Any
+
+
+def _point(place: dict) -> Tuple[float, float]:
+    # Rounded like the directions cache keys, so equal places share matrix rows and cached legs
+    return (round(place["longitude"], DIRECTIONS_COORD_PRECISION), round(place["latitude"], DIRECTIONS_COORD_PRECISION))
+
+
+def _matrix_request(sources: List[Tuple[float, float]], destinations: List[Tuple[float, float]], access_token: str, profile: str):
+    # One Matrix call; (durations, distances) as nested lists with None where there is no route
+    points = sources + destinations
+    coordinates = ";".join(f"{lon},{lat}" for lon, lat in points)
+    params = {
+        "access_token": access_token,
+        "sources": ";".join(str(i) for i in range(len(sources))),
+        "destinations": ";".join(str(i) for i in range(len(sources), len(points))),
+        "annotations": "duration,distance"
+    }
+    response = http_client.get(
+        f"{http_client.MAPBOX_API_BASE}/directions-matrix/v1/{profile}/{coordinates}",
+        endpoint="mapbox.matrix",
+        params=params
+    )
+    response.raise_for_status()
+    data = response.json()
+    if data.get("code") != "Ok":
+        raise ValueError(f"Matrix API returned code {data.get('code')}.")
+    return data["durations"], data["distances"]
+
+
+def travel_matrix(
+    origins: Sequence[Tuple[float, float]],
+    destinations: Sequence[Tuple[float, float]],
+    pairs: Sequence[Tuple[int, int]],
+    access_token: str,
+    profile: str = "mapbox/driving"
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Seconds and metres between origins[i] and destinations[j] for each (i, j) in pairs.
+
+    Returns two (len(origins), len(destinations)) arrays, NaN where a pair
+    was not asked for or has no route. Pairs already in the leg cache are not
+    fetched; the rest are requested in tiles of at most
+    MATRIX_MAX_COORDINATES points, and every cell is cached as a leg.
+    Raises httpx.HTTPError / KeyError / ValueError on API failures.
+    """
+    durations = np.full((len(origins), len(destinations)), np.nan)
+    distances = np.full((len(origins), len(destinations)), np.nan)
+    missing = set()
+    for i, j in set(pairs):
+        leg = cached_leg(origins[i], destinations[j], profile)
+        if leg is MISSING:
+            missing.add((i, j))
+        elif leg is not None:
+            durations[i, j], distances[i, j] = leg["duration"], leg["distance"]
+    matrix_pairs.inc(len(set(pairs)) - len(missing), source="cache")
+    matrix_pairs.inc(len(missing), source="matrix")
+    if not missing:
+        return durations, distances
+
+    rows = sorted({i for i, _ in missing})
+    columns = sorted({j for _, j in missing})
+    # Many origins to a few destinations (or the reverse) fit in one call per tile
+    row_step = max(1, min(len(rows), MATRIX_MAX_COORDINATES - min(len(columns), MATRIX_MAX_COORDINATES // 2)))
+    column_step = MATRIX_MAX_COORDINATES - row_step
+    for r in range(0, len(rows), row_step):
+        tile_rows = rows[r:r + row_step]
+        for c in range(0, len(columns), column_step):
+            tile_columns = columns[c:c + column_step]
+            if not any((i, j) in missing for i in tile_rows for j in tile_columns):
+                continue
+            tile_durations, tile_distances = _matrix_request(
+                [origins[i] for i in tile_rows], [destinations[j] for j in tile_columns], access_token, profile
+            )
+            block = np.array(tile_durations, dtype=float)  # None -> NaN
+            durations[np.ix_(tile_rows, tile_columns)] = block
+            distances[np.ix_(tile_rows, tile_columns)] = np.array(tile_distances, dtype=float)
+            for a, i in enumerate(tile_rows):
+                for b, j in enumerate(tile_columns):
+                    if not np.isnan(block[a, b]):
+                        remember_leg(origins[i], destinations[j], {"distance": tile_distances[a][b], "duration": tile_durations[a][b]}, profile)
+    return durations, distances
+
+
+def check_feasibility_many(trips: Sequence[BatchTrip]) -> List[FeasibilityVerdict]:
+    """Verdicts for many trips, in input order.
+
+    Distinct addresses are geocoded once (cached, batched) and all
+    origin/destination pairs are measured together, so the per-trip cost
+    falls as batches grow. An address that fails to geocode gives its trips
+    a verdict with error set; FeasibilityError is raised only when the token
+    is missing or the Matrix API cannot be reached.
+    """
+    access_token = os.getenv("MAPBOX_ACCESS_TOKEN")
+    if not access_token:
+        raise FeasibilityError("MAPBOX_ACCESS_TOKEN environment variable not set.")
+
+    addresses = list(dict.fromkeys([trip.from_loc for trip in trips] + [trip.to_loc for trip in trips]))
+    places = dict(zip(addresses, geocode_many(addresses, access_token)))
+
+    verdicts: List[Any] = [None] * len(trips)
+    origins: Dict[Tuple[float, float], int] = {}
+    destinations: Dict[Tuple[float, float], int] = {}
+    measured = []  # (trip index, origin row, destination column, days, hours per day)
+    for index, trip in enumerate(trips):
+        days, hours_per_day = positive_number(trip.duration), positive_number(trip.driving_hours)
+        origin, destination = places[trip.from_loc], places[trip.to_loc]
+        if days is None or hours_per_day is None:
+            verdicts[index] = FeasibilityVerdict(False, "the trip duration and daily driving hours must be positive numbers.")
+        elif isinstance(origin, Exception):
+            # A failed lookup only affects the trips that use that address
+            verdicts[index] = FeasibilityVerdict(False, f"the starting location '{trip.from_loc}' could not be geocoded.", error=f"Geocoding failed: {origin}")
+        elif isinstance(destination, Exception):
+            verdicts[index] = FeasibilityVerdict(False, f"the destination '{trip.to_loc}' could not be geocoded.", error=f"Geocoding failed: {destination}")
+        elif origin is None:
+            verdicts[index] = FeasibilityVerdict(False, f"the starting location '{trip.from_loc}' could not be found.", destination=destination)
+        elif destination is None:
+            verdicts[index] = FeasibilityVerdict(False, f"the destination '{trip.to_loc}' could not be found.", origin=origin)
+        else:
+            row = origins.setdefault(_point(origin), len(origins))
+            column = destinations.setdefault(_point(destination), len(destinations))
+            measured.append((index, row, column, days, hours_per_day))
+
+    if measured:
+        try:
+            durations, distances = travel_matrix(
+                list(origins), list(destinations), [(row, column) for _, row, column, _, _ in measured], access_token
+            )
+        except (*http_client.HTTP_ERRORS, KeyError, ValueError) as e:
+            raise FeasibilityError(f"Matrix request failed: {e}")
+        index, rows, columns = (np.array([m[k] for m in measured]) for k in range(3))
+        days, hours_per_day = (np.array([m[k] for m in measured], dtype=float) for k in (3, 4))
+        trip_seconds = durations[rows, columns]
+        trip_metres = distances[rows, columns]
+        # One comparison for the whole batch; trips without a route (NaN) never fit
+        feasible = fits(trip_seconds / 3600, days * hours_per_day)
+        for k in np.flatnonzero(np.isnan(trip_seconds)):
+            trip = trips[index[k]]
+            verdicts[index[k]] = FeasibilityVerdict(
+                False, f"no driving route exists between {trip.from_loc} and {trip.to_loc}.",
+                places[trip.from_loc], places[trip.to_loc]
+            )
+        for k in np.flatnonzero(~np.isnan(trip_seconds)):
+            trip = trips[index[k]]
+            verdicts[index[k]] = route_verdict(
+                places[trip.from_loc], places[trip.to_loc], float(trip_metres[k]), float(trip_seconds[k]),
+                measured[k][3], measured[k][4], feasible=bool(feasible[k])
+            )
+    return verdicts
+
+
+__all__ = ["BATCH_MAX_TRIPS", "BatchTrip", "check_feasibility_many", "travel_matrix"]
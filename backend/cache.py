@@ -0,0 +1,186 @@
+# backend/cache.py
+# Process-wide TTL/LRU caches with optional SQLite persistence.
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from backend.metrics import gauge_lines, register_collector
+
+# Returned by TTLCache.get on a miss, since None is a valid cached value
+MISSING = object()
+
+# The SQLite tier keeps up to this many times the in-memory bound; sweeps trim the rest
+CACHE_PERSIST_FACTOR = int(os.getenv("CACHE_PERSIST_FACTOR", "10"))
+
+# Every cache registers itself here so its counters can be reported
+CACHES: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a TTL.
+
+    When `path` is given, entries are also written through to a SQLite
+    table so they survive restarts and are shared by every worker process
+    on the host. Values must be JSON-serializable in that case. The SQLite
+    tier is only pruned by sweep(), which sweep_caches() runs for every cache.
+
+    Args:
+        name: cache name, used for the SQLite namespace and in stats.
+        max_entries: in-memory LRU bound.
+        ttl: default time-to-live in seconds.
+        path: optional SQLite file for the persistent tier.
+        max_persisted: rows kept in the SQLite tier (default
+            CACHE_PERSIST_FACTOR * max_entries); 0 keeps every unexpired row.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1000, ttl: float = 3600, path: Optional[str] = None,
+                 max_persisted: Optional[int] = None) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.max_persisted = max_entries * CACHE_PERSIST_FACTOR if max_persisted is None else max_persisted
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if path:
+            conn = self._conn()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.commit()
+        CACHES[name] = self
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for key, or MISSING."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+        if self.path:
+            row = self._conn().execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ? AND expires_at >= ?",
+                (self.name, key, now)
+            ).fetchone()
+            if row is not None:
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return MISSING
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._remember(key, value, expires_at)
+        if self.path:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.name, key, json.dumps(value), expires_at)
+                )
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def sweep(self) -> int:
+        """Drop expired entries from both tiers, trim the SQLite tier to max_persisted
+        (soonest to expire first), and return how many were removed."""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry[1] < now]
+            for key in expired:
+                del self._entries[key]
+        removed = len(expired)
+        if self.path:
+            conn = self._conn()
+            with conn:
+                removed += conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND expires_at < ?", (self.name, now)
+                ).rowcount
+                if self.max_persisted:
+                    removed += conn.execute(
+                        "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                        " SELECT key FROM cache WHERE namespace = ?"
+                        " ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                        (self.name, self.name, self.max_persisted)
+                    ).rowcount
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+        if self.path:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM cache WHERE namespace = ?", (self.name,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+def cache_stats() -> dict:
+    """Counters for every registered cache, keyed by cache name."""
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+
+def sweep_caches() -> int:
+    """Sweep every registered cache; returns the number of entries removed."""
+    return sum(cache.sweep() for cache in list(CACHES.values()))
+
+
+def _collect() -> List[str]:
+    stats = cache_stats()
+    lines = []
+    for field, help_text in (("hits", "Cache lookups answered from the cache."),
+                             ("misses", "Cache lookups that missed."),
+                             ("size", "Entries held in memory.")):
+        lines.extend(gauge_lines(f"cache_{field}", help_text, {name: s[field] for name, s in stats.items()}, label="cache"))
+    return lines
+
+
+register_collector(_collect)
+
+
+__all__ = ["CACHES", "MISSING", "TTLCache", "cache_stats", "sweep_caches"]
@@ -0,0 +1,57 @@
+# backend/cancellation.py
+# Cooperative cancellation of agent runs, checked at iteration boundaries.
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class JobCancelled(BaseException):
+    """Raised inside a run whose cancel token was set, at its next LLM call or tool call.
+
+    A BaseException (like asyncio.CancelledError) so the agent loop and the
+    per-day error handling, which catch Exception, let it through.
+    """
+
+
+class CancelToken:
+    """Flag shared by a job and whoever may call it off; safe to set from any thread."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "Cancelled.") -> None:
+        self.reason = reason
+        self._event.set()
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise JobCancelled(self.reason)
+
+
+_current_token: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar("cancel_token", default=None)
+
+
+@contextmanager
+def cancel_scope(token: CancelToken) -> Iterator[CancelToken]:
+    """Make token the current one; executors that copy the context carry it into their workers."""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def check_cancelled() -> None:
+    """Raise JobCancelled if the current run has been cancelled (no-op outside a cancel scope)."""
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+__all__ = ["CancelToken", "JobCancelled", "cancel_scope", "check_cancelled"]
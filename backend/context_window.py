@@ -0,0 +1,159 @@
+# backend/context_window.py
+# Keeps ReAct prompts within a token budget: tool observations are capped when
+# they are produced, and older turns are folded into a rolling scratchpad.
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+from backend.instrumentation import current_run, estimate_tokens
+from backend.metrics import Counter, Histogram
+
+# Estimated prompt tokens per LLM call (0 turns the scratchpad off)
+AGENT_CONTEXT_TOKENS = int(os.getenv("AGENT_CONTEXT_TOKENS", "6000"))
+# Estimated tokens one tool observation may add to the conversation
+AGENT_OBSERVATION_TOKENS = int(os.getenv("AGENT_OBSERVATION_TOKENS", "1000"))
+# Latest messages always sent verbatim
+AGENT_RECENT_MESSAGES = int(os.getenv("AGENT_RECENT_MESSAGES", "4"))
+
+_LINE_CHARS = 300
+_DIGEST_CHARS = 160
+# Lines per older message kept for their figures (coordinates, durations, distances)
+_FACT_LINES = 12
+_FACT = re.compile(
+    r"-?\d{1,3}\.\d+\s*,\s*-?\d{1,3}\.\d+"  # lon,lat / lat, lon pairs
+    r"|\d+(?:\.\d+)?\s*(?:km|mi|miles|min|mins|minutes|h|hr|hrs|hours)\b",
+    re.IGNORECASE
+)
+# Sent as the agent's own notes, so it is not read as a new request from the user
+_SCRATCHPAD_ROLE = "assistant"
+_SCRATCHPAD_HEADER = (
+    "My notes on earlier steps (a condensed record of earlier thoughts and tool results, "
+    "for reference only; not a new request):"
+)
+
+prompt_tokens = Histogram(
+    "agent_iteration_prompt_tokens",
+    "Estimated prompt tokens sent per agent iteration, after compaction.",
+    ["run"],
+    buckets=(250, 500, 1000, 2000, 4000, 6000, 8000, 12000, 16000, 32000)
+)
+compacted_tokens = Counter(
+    "agent_context_compacted_tokens_total",
+    "Estimated tokens kept out of prompts by observation capping and the scratchpad.",
+    ["stage"]
+)
+
+
+def _tokens(messages: List[dict]) -> int:
+    return sum(estimate_tokens(message.get("content", "")) for message in messages)
+
+
+def compact_observation(result: Any, max_tokens: int = AGENT_OBSERVATION_TOKENS) -> Any:
+    """Cap a tool result at about max_tokens, keeping whole lines in order.
+
+    Results within the cap are returned unchanged. Longer ones become text:
+    a header with the original size, then each line (trimmed to a few
+    hundred characters) until the cap, then a count of omitted lines.
+    """
+    text = "\n".join(str(item) for item in result) if isinstance(result, list) else str(result)
+    original = estimate_tokens(text)
+    if max_tokens <= 0 or original <= max_tokens:
+        return result
+
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    kept = []
+    used = 0
+    for line in lines:
+        if len(line) > _LINE_CHARS:
+            line = line[:_LINE_CHARS].rsplit(" ", 1)[0] + "..."
+        cost = estimate_tokens(line) + 1
+        if kept and used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    omitted = len(lines) - len(kept)
+    compacted_tokens.inc(max(0, original - used), stage="observation")
+    header = f"[{len(lines)} lines, ~{original} tokens; showing ~{used}]"
+    footer = [f"[{omitted} more lines omitted]"] if omitted else []
+    return "\n".join([header] + kept + footer)
+
+
+def _shorten(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def _digest(message: dict) -> str:
+    # The first line, plus every line carrying coordinates, durations or distances
+    # (geocoding and directions results the later steps build on)
+    lines = [" ".join(line.split()) for line in str(message.get("content", "")).splitlines() if line.strip()]
+    if not lines:
+        return f"- {message.get('role', 'message')}:"
+    first = _shorten(lines[0], _LINE_CHARS if _FACT.search(lines[0]) else _DIGEST_CHARS)
+    facts = [_shorten(line, _LINE_CHARS) for line in lines[1:] if _FACT.search(line)]
+    kept = [f"  {line}" for line in facts[:_FACT_LINES]]
+    if len(facts) > _FACT_LINES:
+        kept.append(f"  ({len(facts) - _FACT_LINES} more lines with figures omitted)")
+    return "\n".join([f"- {message.get('role', 'message')}: {first}"] + kept)
+
+
+class BoundedContextModel:
+    """Per-agent view of a (shared) model that keeps every prompt within a token budget.
+
+    The leading messages up to the first user message (system prompt and
+    task) and the latest AGENT_RECENT_MESSAGES are sent verbatim. Anything in
+    between is replaced by one scratchpad message, labelled as the agent's own
+    notes, with a condensed entry per message: its first line plus the lines
+    carrying coordinates, durations and distances. The newest entries are
+    kept first when the budget is tight, so prompt size stops growing with the
+    iteration count. All other attributes are delegated to the wrapped model.
+    """
+
+    def __init__(self, model: Any, budget: int = AGENT_CONTEXT_TOKENS, recent: int = AGENT_RECENT_MESSAGES) -> None:
+        self._model = model
+        self.budget = budget
+        self.recent = max(1, recent)
+        self._digests: Dict[Tuple[int, int], str] = {}  # (position, length) -> digest; the conversation only grows
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_model":
+            raise AttributeError(name)
+        return getattr(self._model, name)
+
+    def compact(self, messages: List[dict]) -> List[dict]:
+        """The messages to send for this iteration."""
+        total = _tokens(messages)
+        head_end = next((i + 1 for i, message in enumerate(messages) if message.get("role") == "user"), 1)
+        head, rest = messages[:head_end], messages[head_end:]
+        if self.budget <= 0 or total <= self.budget or len(rest) <= self.recent:
+            return messages
+
+        older, tail = rest[:-self.recent], rest[-self.recent:]
+        lines = []
+        for position, message in enumerate(older):
+            key = (position, len(str(message.get("content", ""))))
+            if key not in self._digests:
+                self._digests[key] = _digest(message)
+            lines.append(self._digests[key])
+
+        room = self.budget - _tokens(head) - _tokens(tail) - estimate_tokens(_SCRATCHPAD_HEADER)
+        kept = []
+        for line in reversed(lines):
+            cost = estimate_tokens(line) + 1
+            if cost > room:
+                break
+            kept.append(line)
+            room -= cost
+        omitted = len(lines) - len(kept)
+        notes = [_SCRATCHPAD_HEADER] + ([f"({omitted} earlier steps omitted)"] if omitted else []) + kept[::-1]
+        compacted = head + [{"role": _SCRATCHPAD_ROLE, "content": "\n".join(notes)}] + tail
+        compacted_tokens.inc(max(0, total - _tokens(compacted)), stage="scratchpad")
+        return compacted
+
+    def chat_completion(self, messages, *args, **kwargs):
+        prompt = self.compact(messages)
+        recorder = current_run()
+        prompt_tokens.observe(_tokens(prompt), run=recorder.name if recorder is not None else "none")
+        return self._model.chat_completion(prompt, *args, **kwargs)
+
+
+__all__ = ["AGENT_CONTEXT_TOKENS", "AGENT_OBSERVATION_TOKENS", "BoundedContextModel", "compact_observation"]
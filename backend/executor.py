@@ -0,0 +1,94 @@
+# backend/executor.py
+# Bounded worker pool for blocking BaseAgent runs.
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+from backend.metrics import gauge_lines, register_collector
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the executor is already holding its maximum number of jobs."""
+
+
+class AgentExecutor:
+    """Fixed-size thread pool with a queue-depth limit and per-job timeouts.
+
+    Agent runs (LLM calls plus Mapbox/search tools) are blocking, so they are
+    submitted here and the event loop only ever awaits the returned futures.
+
+    Args:
+        max_workers: number of agent runs allowed at once (AGENT_MAX_WORKERS, default 4).
+        max_queue: number of jobs allowed to wait for a worker (AGENT_MAX_QUEUE, default 16).
+        timeout: seconds a caller waits for one job (AGENT_JOB_TIMEOUT, default 600).
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> None:
+        self.max_workers = max_workers or int(os.getenv("AGENT_MAX_WORKERS", "4"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("AGENT_MAX_QUEUE", "16"))
+        self.timeout = timeout or float(os.getenv("AGENT_JOB_TIMEOUT", "600"))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="agent")
+        self._lock = threading.Lock()
+        self._in_flight = 0  # running + waiting jobs
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Queue fn on the pool, raising QueueFullError instead of growing unbounded."""
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                raise QueueFullError("Too many trip plans are in progress. Please try again shortly.")
+            self._in_flight += 1
+        # Carry context variables (job id, instrumentation, ...) into the worker thread
+        ctx = contextvars.copy_context()
+        try:
+            future = self._pool.submit(ctx.run, fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def wait(self, future: Future, timeout: Optional[float] = None) -> Any:
+        """Await a submitted future, raising asyncio.TimeoutError after the job timeout.
+
+        A job that times out before it starts is removed from the queue; one that
+        is already running keeps its worker until the blocking call returns.
+        """
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout or self.timeout)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """Submit fn and await its result."""
+        return await self.wait(self.submit(fn, *args, **kwargs), timeout=timeout)
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _release(self, _future: Optional[Future] = None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+
+agent_executor = AgentExecutor()
+
+
+def _collect() -> List[str]:
+    return (gauge_lines("agent_executor_in_flight", "Agent runs running or queued.", {"": agent_executor.in_flight})
+            + gauge_lines("agent_executor_capacity", "Maximum agent runs running or queued.",
+                          {"": agent_executor.max_workers + agent_executor.max_queue}))
+
+
+register_collector(_collect)
+
+
+__all__ = ["AgentExecutor", "QueueFullError", "agent_executor"]
@@ -0,0 +1,120 @@
+# backend/feasibility.py
+# Deterministic route feasibility check: geocode both ends, get directions, compare hours.
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+from backend import http_client
+from backend.tools.directions_tool import get_route
+from backend.tools.geocoding_tool import geocode_many
+
+# Same allowance the itinerary prompts give for going over the daily driving limit
+FEASIBILITY_TOLERANCE = float(os.getenv("FEASIBILITY_TOLERANCE", "0.10"))
+
+
+class FeasibilityError(RuntimeError):
+    """The check could not be completed (missing token, API failure); callers may fall back to the agent."""
+
+
+@dataclass
+class FeasibilityVerdict:
+    feasible: bool
+    reason: str
+    origin: Optional[dict] = None
+    destination: Optional[dict] = None
+    distance_km: Optional[float] = None
+    driving_hours: Optional[float] = None
+    available_hours: Optional[float] = None
+    # Set when the check itself failed (e.g. a geocoding error) rather than the route
+    error: Optional[str] = None
+
+    @property
+    def answer(self) -> str:
+        """Verdict phrased like the route_sanity_check agent's final answer."""
+        if self.feasible:
+            return f"The route is feasible. {self.reason}"
+        return f"The route is not feasible because {self.reason}"
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def positive_number(value: Any) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number > 0 else None
+
+
+def check_feasibility(from_loc: str, to_loc: str, duration: Any, driving_hours: Any) -> FeasibilityVerdict:
+    """Decide whether the drive fits in duration * driving_hours (plus tolerance).
+
+    Uses one geocoding batch and one directions request, both cached.
+    Raises FeasibilityError when Mapbox cannot be reached.
+    """
+    days = positive_number(duration)
+    hours_per_day = positive_number(driving_hours)
+    if days is None or hours_per_day is None:
+        return FeasibilityVerdict(False, "the trip duration and daily driving hours must be positive numbers.")
+
+    access_token = os.getenv("MAPBOX_ACCESS_TOKEN")
+    if not access_token:
+        raise FeasibilityError("MAPBOX_ACCESS_TOKEN environment variable not set.")
+
+    origin, destination = geocode_many([from_loc, to_loc], access_token)
+    for place in (origin, destination):
+        if isinstance(place, Exception):
+            raise FeasibilityError(f"Geocoding failed: {place}")
+    if origin is None:
+        return FeasibilityVerdict(False, f"the starting location '{from_loc}' could not be found.", destination=destination)
+    if destination is None:
+        return FeasibilityVerdict(False, f"the destination '{to_loc}' could not be found.", origin=origin)
+
+    try:
+        route = get_route(
+            [(origin["longitude"], origin["latitude"]), (destination["longitude"], destination["latitude"])],
+            access_token
+        )
+    except (*http_client.HTTP_ERRORS, KeyError, ValueError) as e:
+        raise FeasibilityError(f"Directions request failed: {e}")
+    if route is None:
+        return FeasibilityVerdict(False, f"no driving route exists between {from_loc} and {to_loc}.", origin, destination)
+    return route_verdict(origin, destination, route["distance"], route["duration"], days, hours_per_day)
+
+
+def fits(route_hours: Any, available_hours: Any) -> Any:
+    """Whether the drive fits the available hours plus tolerance; elementwise on numpy arrays."""
+    return route_hours <= available_hours * (1 + FEASIBILITY_TOLERANCE)
+
+
+def route_verdict(origin: dict, destination: dict, distance_m: float, duration_s: float, days: float, hours_per_day: float,
+                  feasible: Optional[bool] = None) -> FeasibilityVerdict:
+    """Verdict for a known drive between two geocoded places; pass feasible if fits() was already applied."""
+    distance_km = distance_m / 1000
+    route_hours = duration_s / 3600
+    available_hours = days * hours_per_day
+    verdict = FeasibilityVerdict(
+        feasible=fits(route_hours, available_hours) if feasible is None else feasible,
+        reason="",
+        origin=origin,
+        destination=destination,
+        distance_km=round(distance_km, 1),
+        driving_hours=round(route_hours, 2),
+        available_hours=available_hours
+    )
+    if verdict.feasible:
+        verdict.reason = (
+            f"The drive is about {route_hours:.1f} hours ({distance_km:.0f} km), "
+            f"within the {available_hours:g} hours available over {days:g} days."
+        )
+    else:
+        verdict.reason = (
+            f"the drive takes about {route_hours:.1f} hours ({distance_km:.0f} km), "
+            f"but only {available_hours:g} hours of driving are available over {days:g} days "
+            f"({hours_per_day:g} hours per day, even allowing {FEASIBILITY_TOLERANCE:.0%} extra)."
+        )
+    return verdict
+
+
+__all__ = ["FeasibilityError", "FeasibilityVerdict", "check_feasibility", "fits", "positive_number", "route_verdict"]
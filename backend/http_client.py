@@ -0,0 +1,231 @@
+# backend/http_client.py
+# Shared, pooled HTTP client used by every tool in backend/tools/: one
+# httpx.AsyncClient living on a tool event loop, with blocking wrappers.
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from backend.metrics import Counter, Histogram
+
+# Keep-alive pool; HTTP_POOL_MAXSIZE is a hard limit on concurrent requests per host
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "10"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Overridable so benchmarks can point the Mapbox tools at a local stand-in server
+MAPBOX_API_BASE = os.getenv("MAPBOX_API_BASE", "https://api.mapbox.com").rstrip("/")
+
+http_latency = Histogram(
+    "http_client_request_seconds",
+    "Latency of outbound HTTP requests made by tools, per endpoint and status.",
+    ["endpoint", "status"]
+)
+http_retries = Counter(
+    "http_client_retries_total",
+    "Outbound HTTP requests retried after a transient error or rate limit.",
+    ["endpoint", "reason"]
+)
+
+# Errors the client raises for transport failures and (from raise_for_status) bad statuses
+HTTP_ERRORS = (httpx.HTTPError,)
+HTTP_STATUS_ERRORS = (httpx.HTTPStatusError,)
+
+# The async client is bound to the loop it was created on, so every tool
+# coroutine runs on one daemon event-loop thread (see run_coroutine)
+_async_state = {"loop": None, "thread": None, "client": None}
+_async_lock = threading.Lock()
+# host -> semaphore capping requests in flight to it; only touched on the tool loop
+_host_slots = {}
+
+# host -> epoch seconds until which the host asked us to back off
+_rate_limited_until = {}
+_rate_limit_lock = threading.Lock()
+
+
+def _retry_delay(response: Optional[httpx.Response], attempt: int) -> float:
+    """Seconds to wait before the next attempt: server hint if present, else jittered backoff."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), HTTP_BACKOFF_MAX)
+            except ValueError:
+                pass
+            try:
+                parsed = email.utils.parsedate_to_datetime(retry_after)
+                return min(max(parsed.timestamp() - time.time(), 0), HTTP_BACKOFF_MAX)
+            except (TypeError, ValueError):
+                pass
+        # Mapbox reports the epoch second at which its rate-limit window resets
+        reset = response.headers.get("X-Rate-Limit-Reset")
+        if reset and reset.isdigit():
+            return min(max(int(reset) - time.time(), 0), HTTP_BACKOFF_MAX)
+    # Full jitter keeps many workers from retrying in lockstep
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+
+
+def _tool_loop() -> asyncio.AbstractEventLoop:
+    if _async_state["loop"] is None:
+        with _async_lock:
+            if _async_state["loop"] is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="tool-loop", daemon=True)
+                thread.start()
+                _async_state["thread"] = thread
+                _async_state["loop"] = loop
+    return _async_state["loop"]
+
+
+def _async_client() -> httpx.AsyncClient:
+    # Only called on the tool loop, which is single-threaded
+    if _async_state["client"] is None:
+        _async_state["client"] = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_HOSTS * HTTP_POOL_MAXSIZE,
+                max_keepalive_connections=HTTP_POOL_HOSTS * HTTP_POOL_MAXSIZE
+            ),
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        )
+    return _async_state["client"]
+
+
+def _host_slot(host: str) -> asyncio.Semaphore:
+    # httpx only limits connections in total, so the per-host bound is kept here
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = _host_slots[host] = asyncio.Semaphore(HTTP_POOL_MAXSIZE)
+    return slot
+
+
+def run_coroutine(coro):
+    """Run a tool coroutine on the shared tool loop and block until it finishes.
+
+    Context variables (such as the current run recorder) are carried over
+    from the calling thread. Must not be called from the tool loop itself.
+    """
+    loop = _tool_loop()
+    if threading.current_thread() is _async_state["thread"]:
+        coro.close()
+        raise RuntimeError("run_coroutine() called from the tool loop; await the coroutine instead.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def start_once(flights: dict, key, make):
+    """The task in flights for key, or a new one running make() if none is in flight.
+
+    Lets concurrent callers share one lookup: each awaits
+    asyncio.shield(task), so one caller giving up does not cancel it for the
+    others. The task removes itself from flights when done. Only call this on
+    the tool loop.
+    """
+    task = flights.get(key)
+    if task is None:
+        task = flights[key] = asyncio.ensure_future(make())
+        task.add_done_callback(lambda _: flights.pop(key, None))
+    return task
+
+
+async def _await_host(host: str) -> None:
+    with _rate_limit_lock:
+        until = _rate_limited_until.get(host, 0)
+    delay = until - time.time()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+async def arequest(method: str, url: str, endpoint: Optional[str] = None, retries: Optional[int] = None, **kwargs) -> httpx.Response:
+    """Send a request through the shared client with timeouts and retries.
+
+    Connection errors, timeouts and 429/5xx responses are retried up to
+    `retries` times (HTTP_MAX_RETRIES). A 429 also holds back every other
+    request to that host until its Retry-After / rate-limit reset passes, and
+    at most HTTP_POOL_MAXSIZE requests to one host are in flight at once.
+    The last response is returned as-is, so callers still call
+    raise_for_status(), which raises httpx.HTTPStatusError (see HTTP_ERRORS).
+    Only await it on the tool loop; blocking code uses request().
+
+    Args:
+        method: HTTP method.
+        url: request URL.
+        endpoint: label for latency metrics (default: the URL host).
+        retries: override for the number of retries.
+        **kwargs: passed to httpx.AsyncClient.request (params, json, headers, timeout, ...).
+    """
+    host = urlsplit(url).netloc
+    endpoint = endpoint or host
+    retries = HTTP_MAX_RETRIES if retries is None else retries
+
+    attempt = 0
+    while True:
+        await _await_host(host)
+        try:
+            async with _host_slot(host):
+                start = time.perf_counter()
+                response = await _async_client().request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            http_latency.observe(time.perf_counter() - start, endpoint=endpoint, status="error")
+            if attempt >= retries:
+                raise
+            http_retries.inc(endpoint=endpoint, reason=type(e).__name__)
+            await asyncio.sleep(_retry_delay(None, attempt))
+            attempt += 1
+            continue
+
+        http_latency.observe(time.perf_counter() - start, endpoint=endpoint, status=response.status_code)
+        if response.status_code not in RETRY_STATUSES or attempt >= retries:
+            return response
+
+        delay = _retry_delay(response, attempt)
+        if response.status_code == 429:
+            with _rate_limit_lock:
+                _rate_limited_until[host] = max(_rate_limited_until.get(host, 0), time.time() + delay)
+        http_retries.inc(endpoint=endpoint, reason=str(response.status_code))
+        await response.aclose()
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def aget(url: str, endpoint: Optional[str] = None, **kwargs) -> httpx.Response:
+    return await arequest("GET", url, endpoint=endpoint, **kwargs)
+
+
+async def apost(url: str, endpoint: Optional[str] = None, **kwargs) -> httpx.Response:
+    return await arequest("POST", url, endpoint=endpoint, **kwargs)
+
+
+def request(method: str, url: str, endpoint: Optional[str] = None, retries: Optional[int] = None, **kwargs) -> httpx.Response:
+    """Blocking arequest(), for code running outside the tool loop (agent and worker threads)."""
+    return run_coroutine(arequest(method, url, endpoint=endpoint, retries=retries, **kwargs))
+
+
+def get(url: str, endpoint: Optional[str] = None, **kwargs) -> httpx.Response:
+    return request("GET", url, endpoint=endpoint, **kwargs)
+
+
+def post(url: str, endpoint: Optional[str] = None, **kwargs) -> httpx.Response:
+    return request("POST", url, endpoint=endpoint, **kwargs)
+
+
+def warm(urls) -> None:
+    """Open a pooled keep-alive connection to each URL's host; failures are ignored."""
+    for url in urls:
+        try:
+            request("HEAD", url, endpoint="warmup", retries=0, timeout=HTTP_CONNECT_TIMEOUT)
+        except httpx.HTTPError:
+            pass
+
+
+__all__ = ["HTTP_ERRORS", "HTTP_STATUS_ERRORS", "aget", "apost", "arequest", "get", "post", "request", "run_coroutine", "start_once", "warm"]
@@ -0,0 +1,169 @@
+# backend/instrumentation.py
+# Per-run spans for LLM and tool calls, plus the matching Prometheus metrics.
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional
+
+from backend.cancellation import JobCancelled, check_cancelled
+from backend.metrics import Counter, Histogram
+
+llm_call_seconds = Histogram("agent_llm_call_seconds", "Latency of LLM completions.", ["model"])
+llm_tokens = Counter(
+    "agent_llm_tokens_total",
+    "Estimated LLM tokens (characters / 4) sent and received.",
+    ["model", "direction"]
+)
+tool_call_seconds = Histogram("agent_tool_call_seconds", "Latency of agent tool calls.", ["tool", "status"])
+tool_payload_chars = Counter("agent_tool_payload_chars_total", "Characters passed into and returned by tools.", ["tool", "direction"])
+run_seconds = Histogram(
+    "agent_run_seconds",
+    "Wall time of whole agent runs.",
+    ["run", "status"],
+    buckets=(1, 5, 10, 20, 30, 60, 90, 120, 180, 300, 600)
+)
+run_iterations = Histogram(
+    "agent_run_iterations",
+    "LLM iterations used per agent run.",
+    ["run"],
+    buckets=(1, 2, 3, 5, 8, 10, 15, 20, 25, 30)
+)
+
+_current_run: contextvars.ContextVar[Optional["RunRecorder"]] = contextvars.ContextVar("current_run", default=None)
+
+
+def estimate_tokens(value: Any) -> int:
+    """Rough token count for prompts/completions (about 4 characters per token)."""
+    return (len(value if isinstance(value, str) else str(value)) + 3) // 4
+
+
+class RunRecorder:
+    """Collects the spans of one job so they can be stored with its result."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.spans: List[dict] = []
+        self.started = time.perf_counter()
+
+    def add(self, kind: str, name: str, seconds: float, input_size: int, output_size: int, error: Optional[str] = None) -> None:
+        self.spans.append({
+            "kind": kind,
+            "name": name,
+            "ms": round(seconds * 1000, 1),
+            "in": input_size,
+            "out": output_size,
+            "error": error
+        })
+
+    @property
+    def iterations(self) -> int:
+        return sum(1 for span in self.spans if span["kind"] == "llm")
+
+    def summary(self) -> dict:
+        totals = {}
+        for span in self.spans:
+            total = totals.setdefault(span["kind"], {"calls": 0, "ms": 0.0, "errors": 0})
+            total["calls"] += 1
+            total["ms"] = round(total["ms"] + span["ms"], 1)
+            total["errors"] += span["error"] is not None
+        return {
+            "run": self.name,
+            "wall_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "iterations": self.iterations,
+            "llm_tokens_in": sum(span["in"] for span in self.spans if span["kind"] == "llm"),
+            "llm_tokens_out": sum(span["out"] for span in self.spans if span["kind"] == "llm"),
+            # Prompt size of every LLM call, in order; flat once the context budget is reached
+            "llm_tokens_per_iteration": [span["in"] for span in self.spans if span["kind"] == "llm"],
+            "totals": totals,
+            "spans": self.spans
+        }
+
+
+def current_run() -> Optional[RunRecorder]:
+    return _current_run.get()
+
+
+@contextmanager
+def record_run(name: str) -> Iterator[RunRecorder]:
+    """Record every LLM/tool span made in this context (and in executors that copy it)."""
+    recorder = RunRecorder(name)
+    token = _current_run.set(recorder)
+    status = "ok"
+    try:
+        yield recorder
+    except JobCancelled:
+        status = "cancelled"
+        raise
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _current_run.reset(token)
+        run_seconds.observe(time.perf_counter() - recorder.started, run=name, status=status)
+        run_iterations.observe(recorder.iterations, run=name)
+
+
+@contextmanager
+def tool_span(tool: str, tool_input: Any) -> Iterator[dict]:
+    """Time one tool call; set span["output"] (and span["error"] for failures) before leaving."""
+    span = {"output": None, "error": None}
+    start = time.perf_counter()
+    error = None
+    try:
+        yield span
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        error = error or span["error"]
+        input_size = len(str(tool_input))
+        output_size = len(str(span["output"])) if span["output"] is not None else 0
+        tool_call_seconds.observe(seconds, tool=tool, status="error" if error else "ok")
+        tool_payload_chars.inc(input_size, tool=tool, direction="in")
+        tool_payload_chars.inc(output_size, tool=tool, direction="out")
+        recorder = current_run()
+        if recorder is not None:
+            recorder.add("tool", tool, seconds, input_size, output_size, error)
+
+
+class InstrumentedModel:
+    """Wraps an agentpro model so every chat_completion is timed and token-counted.
+
+    All other attributes are delegated to the wrapped model.
+    """
+
+    def __init__(self, model: Any, model_name: str) -> None:
+        self._model = model
+        self.model_name = model_name
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_model":
+            raise AttributeError(name)
+        return getattr(self._model, name)
+
+    def chat_completion(self, messages, *args, **kwargs):
+        # Iteration boundary: a cancelled run stops before paying for another completion
+        check_cancelled()
+        tokens_in = sum(estimate_tokens(message.get("content", "")) for message in messages)
+        start = time.perf_counter()
+        error = None
+        response = None
+        try:
+            response = self._model.chat_completion(messages, *args, **kwargs)
+            return response
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            tokens_out = estimate_tokens(response) if response is not None else 0
+            llm_call_seconds.observe(seconds, model=self.model_name)
+            llm_tokens.inc(tokens_in, model=self.model_name, direction="in")
+            llm_tokens.inc(tokens_out, model=self.model_name, direction="out")
+            recorder = current_run()
+            if recorder is not None:
+                recorder.add("llm", self.model_name, seconds, tokens_in, tokens_out, error)
+
+
+__all__ = ["InstrumentedModel", "RunRecorder", "current_run", "estimate_tokens", "record_run", "tool_span"]
@@ -0,0 +1,218 @@
+# backend/itinerary_parser.py
+# Turns the agents' DAY_SECTIONS / SUMMARY_SECTIONS text into typed, validated JSON.
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Iterator, List, Optional
+
+_DAY_HEADER = re.compile(r"^\s*\**\s*Day\s+(\d+)\s*\**\s*:?\s*$", re.IGNORECASE)
+_POI_LINE = re.compile(r"^([^()]+?)\s*\(\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*\)\s*:?\s*(.*)$")
+_MINUTES = re.compile(r"\(\s*(\d+(?:\.\d+)?)\s*min", re.IGNORECASE)
+_HOURS = re.compile(r"(\d+(?:\.\d+)?)\s*(?:h|hr|hrs|hour|hours)\b", re.IGNORECASE)
+_KM = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*km", re.IGNORECASE)
+_FIELDS = (
+    ("route coordinates", "route_coordinates"),
+    ("route", "route"),
+    ("driving", "driving"),
+    ("start time suggestion", "start_time"),
+    ("attractions & points of interest", "attractions"),
+    ("notes", "notes"),
+    ("overnight", "overnight"),
+    ("accommodation options", "accommodation"),
+    ("dining options", "dining"),
+)
+
+
+@dataclass
+class PointOfInterest:
+    name: str
+    lon: float
+    lat: float
+    description: str = ""
+
+
+@dataclass
+class DayPlan:
+    day: int
+    route: str = ""
+    route_from: str = ""
+    route_to: str = ""
+    route_coordinates: List[List[float]] = field(default_factory=list)  # [[lon, lat], ...]
+    driving: str = ""
+    driving_minutes: Optional[float] = None
+    distance_km: Optional[float] = None
+    start_time: str = ""
+    pois: List[PointOfInterest] = field(default_factory=list)
+    notes: str = ""
+    overnight: str = ""
+    accommodation: str = ""
+    dining: str = ""
+    why: str = ""
+    other: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _valid_lon_lat(lon: float, lat: float) -> bool:
+    return -180 <= lon <= 180 and -90 <= lat <= 90
+
+
+def parse_coordinates(text: str) -> List[List[float]]:
+    """'[lon,lat;lon,lat]' -> [[lon, lat], ...]; pairs that do not parse are skipped."""
+    points = []
+    for pair in text.strip().strip("[]").split(";"):
+        try:
+            lon, lat = (float(value) for value in pair.split(","))
+        except ValueError:
+            continue
+        points.append([lon, lat])
+    return points
+
+
+def _parse_driving(day: DayPlan, text: str) -> None:
+    day.driving = text
+    minutes = _MINUTES.search(text)
+    if minutes:
+        day.driving_minutes = float(minutes.group(1))
+    else:
+        hours = _HOURS.search(text)
+        if hours:
+            day.driving_minutes = round(float(hours.group(1)) * 60, 1)
+    km = _KM.search(text)
+    if km:
+        day.distance_km = float(km.group(1).replace(",", ""))
+
+
+def _split_field(line: str):
+    # "- Route Coordinates: [..]" -> ("route_coordinates", "[..]"); None if it is not a known field
+    body = line.lstrip("-*• ").strip()
+    lowered = body.casefold()
+    for label, name in _FIELDS:
+        if lowered.startswith(label + ":"):
+            return name, body[len(label) + 1:].strip()
+    if lowered.startswith("why ") and ":" in body:
+        return "why", body.split(":", 1)[1].strip()
+    return None
+
+
+def _add_poi(day: DayPlan, text: str) -> bool:
+    # "Name (lon,lat): description"; returns False if the line is not a POI
+    poi = _POI_LINE.match(text)
+    if not poi:
+        return False
+    name, lon, lat, description = poi.group(1).strip(), float(poi.group(2)), float(poi.group(3)), poi.group(4).strip()
+    if _valid_lon_lat(lon, lat):
+        day.pois.append(PointOfInterest(name, lon, lat, description))
+    else:
+        day.warnings.append(f"POI '{name}' has out-of-range coordinates.")
+    return True
+
+
+def parse_day(number: int, lines: List[str]) -> DayPlan:
+    """Parse the lines that follow a 'Day N' header."""
+    day = DayPlan(day=number)
+    in_attractions = False
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            continue
+        parsed = _split_field(line)
+        if parsed is None:
+            body = line.lstrip("-*• ").strip()
+            if not (in_attractions and _add_poi(day, body)) and body:
+                day.other.append(body)
+            continue
+
+        name, value = parsed
+        in_attractions = name == "attractions"
+        if name == "route":
+            day.route = value
+            parts = re.split(r"\s*(?:→|->|–|—)\s*", value, maxsplit=1)
+            if len(parts) == 2:
+                day.route_from, day.route_to = parts
+        elif name == "route_coordinates":
+            day.route_coordinates = parse_coordinates(value)
+        elif name == "driving":
+            _parse_driving(day, value)
+        elif name == "attractions":
+            if value:
+                _add_poi(day, value)
+        else:
+            setattr(day, name, value)
+    validate_day(day)
+    return day
+
+
+def field_warnings(day: DayPlan) -> List[str]:
+    """Warnings for missing or inconsistent route and driving fields."""
+    warnings = []
+    if not day.route:
+        warnings.append("Missing route.")
+    if len(day.route_coordinates) < 2:
+        warnings.append("Route coordinates need a start and an end point.")
+    elif not all(_valid_lon_lat(lon, lat) for lon, lat in day.route_coordinates):
+        warnings.append("Route coordinates are out of range (expected longitude,latitude).")
+    if day.driving and day.driving_minutes is None:
+        warnings.append("Could not read driving minutes.")
+    return warnings
+
+
+def validate_day(day: DayPlan) -> List[str]:
+    """Append field_warnings() to the day's warnings and return them."""
+    day.warnings.extend(field_warnings(day))
+    return day.warnings
+
+
+def _sections(text: str):
+    # (day text, summary text) following the prompt's DAY_SECTIONS / SUMMARY_SECTIONS markers
+    if "DAY_SECTIONS:" in text:
+        text = text.split("DAY_SECTIONS:", 1)[1]
+    if "SUMMARY_SECTIONS:" in text:
+        days, summary = text.split("SUMMARY_SECTIONS:", 1)
+        return days, summary
+    return text, ""
+
+
+def iter_days(text: str) -> Iterator[DayPlan]:
+    """Yield each day as soon as its block has been read."""
+    days_text, _ = _sections(text)
+    number, block = None, []
+    for line in days_text.splitlines():
+        header = _DAY_HEADER.match(line)
+        if header:
+            if number is not None:
+                yield parse_day(number, block)
+            number, block = int(header.group(1)), []
+        elif number is not None:
+            block.append(line)
+    if number is not None:
+        yield parse_day(number, block)
+
+
+def parse_summary(text: str) -> List[dict]:
+    """SUMMARY_SECTIONS -> [{"title": ..., "items": [...]}, ...]."""
+    _, summary_text = _sections(text)
+    sections = []
+    for line in summary_text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("-"):
+            if not sections:
+                sections.append({"title": "Summary", "items": []})
+            sections[-1]["items"].append(line.lstrip("- ").strip())
+        else:
+            sections.append({"title": line, "items": []})
+    return sections
+
+
+def parse_itinerary(text: str) -> dict:
+    """Whole agent answer -> {"days": [...], "summary": [...]}."""
+    return {
+        "days": [day.to_dict() for day in iter_days(text)],
+        "summary": parse_summary(text)
+    }
+
+
+__all__ = ["DayPlan", "PointOfInterest", "field_warnings", "iter_days", "parse_day", "parse_itinerary", "parse_summary", "validate_day"]
@@ -0,0 +1,203 @@
+# backend/itinerary_pipeline.py
+# Map-reduce itinerary planning: choose the overnight stops once, research every
+# day with its own small agent in parallel, then merge the days in order.
+import contextvars
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from backend import http_client
+from backend.agent_prompts import AGENT_PROMPTS
+from backend.baseAgent import BaseAgent, shared_tools
+from backend.itinerary_parser import DayPlan, field_warnings, iter_days, parse_day, validate_day
+from backend.tools.ddgs_tool import DDGSTool
+from backend.tools.directions_tool import get_route
+from backend.tools.geocoding_tool import GeocodingTool, geocode_many, normalize_query
+from backend.tools.poi_tool import PoiCorridorTool
+
+ITINERARY_PIPELINE = os.getenv("ITINERARY_PIPELINE", "1") == "1"
+# Iteration budget of each per-day agent
+ITINERARY_DAY_ITERATIONS = int(os.getenv("ITINERARY_DAY_ITERATIONS", "8"))
+# Day agents running at once across all jobs; kept apart from the job executor
+# so a job never waits on a worker its own siblings are holding
+_day_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ITINERARY_DAY_WORKERS", "8")),
+    thread_name_prefix="itinerary-day"
+)
+_MAX_WAYPOINTS = 25  # Mapbox Directions limit, so at most 24 days
+# Attractions closer than this (in degrees, ~100 m) count as the same place
+_DUPLICATE_PRECISION = 3
+
+
+class PipelineError(RuntimeError):
+    """The overnight stops could not be planned; callers fall back to the single itinerary agent."""
+
+
+@dataclass
+class TripRequest:
+    kind: str  # "utility" or "relaxed"
+    from_loc: str
+    to_loc: str
+    duration: int
+    driving_hours: str
+    hurry: str = ""
+    preferences: List[str] = field(default_factory=list)
+
+    def describe(self) -> str:
+        extra = f"Regarding hurry: {self.hurry}." if self.kind == "utility" else \
+            f"My preferences are: {', '.join(self.preferences) or 'general interests'}."
+        return (f"a road trip from {self.from_loc} to {self.to_loc}. The trip will last {self.duration} days, "
+                f"and I plan to drive about {self.driving_hours} hours each day. {extra}")
+
+
+@dataclass
+class Leg:
+    day: int
+    start: dict  # geocoded place: name, place_formatted, longitude, latitude
+    end: dict
+    end_query: str
+    distance_km: float
+    minutes: float
+
+    @property
+    def driving(self) -> str:
+        """Drive in the prompts' Driving format, e.g. '5 h 10 min (310 min), 480 km'."""
+        hours, minutes = divmod(round(self.minutes), 60)
+        return f"{hours} h {minutes} min ({self.minutes:.0f} min), {self.distance_km:.0f} km"
+
+    def describe(self) -> str:
+        return f"{self.start['name']} → {self.end['name']}, {self.driving}"
+
+
+def _stop_names(trip: TripRequest) -> List[str]:
+    # One model call (no tools) returning the overnight cities as a JSON array
+    if trip.duration <= 1:
+        return []
+    agent = BaseAgent(custom_system_prompt=AGENT_PROMPTS["itinerary_stops"], tools=[], max_iterations=2)
+    answer = agent.agent.run(f"Plan the overnight stops for {trip.describe()}").final_answer
+    match = re.search(r"\[.*\]", answer, re.DOTALL)
+    try:
+        names = json.loads(match.group(0)) if match else None
+    except ValueError:
+        names = None
+    if not isinstance(names, list) or len(names) != trip.duration - 1:
+        raise PipelineError(f"Expected {trip.duration - 1} overnight stops, got: {answer[:200]}")
+    return [str(name) for name in names]
+
+
+def plan_legs(trip: TripRequest) -> List[Leg]:
+    """Overnight stops from the model, then geocoding and per-day drive times from Mapbox."""
+    if not 1 <= trip.duration < _MAX_WAYPOINTS:
+        raise PipelineError(f"Trips of {trip.duration} days are planned by the single agent.")
+    access_token = os.getenv("MAPBOX_ACCESS_TOKEN")
+    if not access_token:
+        raise PipelineError("MAPBOX_ACCESS_TOKEN environment variable not set.")
+
+    queries = [trip.from_loc] + _stop_names(trip) + [trip.to_loc]
+    places = geocode_many(queries, access_token)
+    for query, place in zip(queries, places):
+        if place is None or isinstance(place, Exception):
+            raise PipelineError(f"Could not geocode '{query}'.")
+    try:
+        route = get_route([(place["longitude"], place["latitude"]) for place in places], access_token)
+    except (*http_client.HTTP_ERRORS, KeyError, ValueError) as e:
+        raise PipelineError(f"Directions request failed: {e}")
+    if route is None or len(route["legs"]) != len(places) - 1:
+        raise PipelineError("No driving route through the overnight stops.")
+
+    return [
+        Leg(day, start, end, query, leg["distance"] / 1000, leg["duration"] / 60)
+        for day, (start, end, query, leg) in enumerate(zip(places, places[1:], queries[1:], route["legs"]), 1)
+    ]
+
+
+def research_day(trip: TripRequest, leg: Leg, on_step: Optional[Callable[[dict], None]] = None) -> DayPlan:
+    """Run one small agent for the day's stops and lodging, then pin the computed route onto its answer."""
+    def report(step):
+        on_step(dict(step, day=leg.day))
+
+    agent = BaseAgent(
+        custom_system_prompt=AGENT_PROMPTS[f"itinerary_day_{trip.kind}"],
+        tools=shared_tools(PoiCorridorTool, DDGSTool) if trip.kind == "utility" else shared_tools(PoiCorridorTool, DDGSTool, GeocodingTool),
+        max_iterations=ITINERARY_DAY_ITERATIONS,
+        on_step=report if on_step is not None else None
+    )
+    query = (f"Day {leg.day} of {trip.describe()} "
+             f"Today's drive: {leg.describe()}. Overnight in {leg.end_query}. "
+             f"Route coordinates: {leg.start['longitude']},{leg.start['latitude']};{leg.end['longitude']},{leg.end['latitude']}")
+    try:
+        answer = agent.agent.run(query).final_answer
+        day = next(iter_days(answer), None) or parse_day(leg.day, answer.splitlines())
+        # Route and driving warnings are recomputed below from the leg; others (e.g. POIs) stay
+        stale = set(field_warnings(day))
+        day.warnings = [warning for warning in day.warnings if warning not in stale]
+    except Exception as e:
+        day = DayPlan(day=leg.day, warnings=[f"Research for this day failed: {e}"])
+
+    day.day = leg.day
+    day.route_from, day.route_to = leg.start["name"], leg.end["name"]
+    day.route = f"{day.route_from} → {day.route_to}"
+    day.route_coordinates = [[leg.start["longitude"], leg.start["latitude"]], [leg.end["longitude"], leg.end["latitude"]]]
+    day.driving = leg.driving
+    day.driving_minutes = round(leg.minutes, 1)
+    day.distance_km = round(leg.distance_km, 1)
+    day.overnight = day.overnight or leg.end_query
+    validate_day(day)
+    return day
+
+
+def _drop_duplicates(day: DayPlan, seen: dict) -> None:
+    # seen maps a name or rounded location to the day that first listed it
+    kept = []
+    for poi in day.pois:
+        keys = (normalize_query(poi.name), (round(poi.lon, _DUPLICATE_PRECISION), round(poi.lat, _DUPLICATE_PRECISION)))
+        first = next((seen[key] for key in keys if key in seen), None)
+        if first is not None:
+            day.warnings.append(f"Dropped duplicate attraction '{poi.name}' (already on day {first}).")
+            continue
+        for key in keys:
+            seen[key] = day.day
+        kept.append(poi)
+    day.pois = kept
+
+
+def plan_itinerary(
+    trip: TripRequest,
+    on_step: Optional[Callable[[dict], None]] = None,
+    on_day: Optional[Callable[[DayPlan], None]] = None
+) -> dict:
+    """Plan the whole trip as {"days": [...], "summary": [...]}.
+
+    Days are researched concurrently, so wall time follows the slowest day
+    rather than the sum of all days. They are merged in order, each handed to
+    on_day as soon as it and every earlier day are done. Raises PipelineError
+    when the stops cannot be planned.
+    """
+    legs = plan_legs(trip)
+    futures = [
+        _day_pool.submit(contextvars.copy_context().run, research_day, trip, leg, on_step)
+        for leg in legs
+    ]
+
+    days, seen = [], {}
+    for future in futures:
+        day = future.result()
+        _drop_duplicates(day, seen)
+        days.append(day)
+        if on_day is not None:
+            on_day(day)
+
+    total_minutes = sum(leg.minutes for leg in legs)
+    hours, minutes = divmod(round(total_minutes), 60)
+    items = [f"Leg {leg.day}: {leg.describe()}" for leg in legs]
+    items.append(f"Total: {hours} h {minutes} min, {sum(leg.distance_km for leg in legs):.0f} km")
+    return {
+        "days": [day.to_dict() for day in days],
+        "summary": [{"title": "Estimated total trip driving time", "items": items}]
+    }
+
+
+__all__ = ["ITINERARY_PIPELINE", "Leg", "PipelineError", "TripRequest", "plan_itinerary", "plan_legs", "research_day"]
@@ -0,0 +1,56 @@
+# backend/job_events.py
+# In-process pub/sub used to push job updates to streaming (SSE) clients.
+import asyncio
+import json
+import threading
+
+
+class JobEventBus:
+    """Fan out job events to subscribers waiting on the event loop.
+
+    Workers publish from executor threads; each subscriber owns an asyncio.Queue
+    that is filled through call_soon_threadsafe, so publishing never blocks.
+    Events only reach subscribers in the same process; streaming clients also
+    re-check the job store so jobs running on another worker still complete.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers = {}  # job_id -> list of (loop, queue)
+        self._lock = threading.Lock()
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        """Register a queue for job_id; must be called from the event loop."""
+        queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers.setdefault(job_id, []).append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = [s for s in self._subscribers.get(job_id, []) if s[1] is not queue]
+            if subscribers:
+                self._subscribers[job_id] = subscribers
+            else:
+                self._subscribers.pop(job_id, None)
+
+    def publish(self, job_id: str, event: str, data: dict) -> None:
+        """Send an event to every subscriber of job_id; safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(job_id, []))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+            except RuntimeError:
+                # Subscriber's loop already closed
+                pass
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+job_events = JobEventBus()
+
+
+__all__ = ["JobEventBus", "format_sse", "job_events"]
@@ -0,0 +1,237 @@
+# backend/job_store.py
+# Bounded job storage shared by the API handlers and itinerary workers.
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+# Results larger than this (in bytes of JSON) are zlib-compressed
+COMPRESS_THRESHOLD = 1024
+
+
+def _encode_result(result: Any) -> Tuple[bytes, bool]:
+    raw = json.dumps(result, separators=(",", ":")).encode("utf-8")
+    if len(raw) > COMPRESS_THRESHOLD:
+        return zlib.compress(raw, 6), True
+    return raw, False
+
+
+def _decode_result(blob: Optional[bytes], compressed: bool) -> Any:
+    if blob is None:
+        return None
+    if compressed:
+        blob = zlib.decompress(blob)
+    return json.loads(blob.decode("utf-8"))
+
+
+class JobStore(ABC):
+    """Interface for job status storage.
+
+    Jobs are dicts of the form {"status": ..., "result": ...}. Every job expires
+    `ttl` seconds after its last update.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+
+    @abstractmethod
+    def create(self, job_id: str) -> None:
+        """Record a new job in the "processing" state."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[dict]:
+        """Return the job, or None if it does not exist or has expired."""
+
+    @abstractmethod
+    def finish(self, job_id: str, status: str, result: Any) -> bool:
+        """Move a processing job to its final status; returns False if it was not processing."""
+
+    @abstractmethod
+    def delete(self, job_id: str) -> None:
+        """Remove a job."""
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Drop expired jobs and return how many were removed."""
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryJobStore(JobStore):
+    """In-process store with LRU eviction (of finished jobs only) and TTL expiry.
+
+    Only visible to the current worker process; use SqliteJobStore when
+    running several uvicorn workers.
+    """
+
+    def __init__(self, max_jobs: int = 1000, ttl: float = 86400) -> None:
+        super().__init__(ttl)
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()  # job_id -> (status, blob, compressed, expires_at)
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str) -> None:
+        self._put(job_id, "processing", None)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None:
+                return None
+            status, blob, compressed, expires_at = entry
+            if expires_at < time.time():
+                del self._jobs[job_id]
+                return None
+            self._jobs.move_to_end(job_id)
+        return {"status": status, "result": _decode_result(blob, compressed)}
+
+    def finish(self, job_id: str, status: str, result: Any) -> bool:
+        blob, compressed = _encode_result(result)
+        # Check and write under one lock, so a worker and the timeout watcher cannot both finish a job
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None or entry[0] != "processing":
+                return False
+            self._put_locked(job_id, status, blob, compressed)
+        return True
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def sweep(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, entry in self._jobs.items() if entry[3] < now]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+    def _put(self, job_id: str, status: str, result: Any) -> None:
+        blob, compressed = _encode_result(result) if result is not None else (None, False)
+        with self._lock:
+            self._put_locked(job_id, status, blob, compressed)
+
+    def _put_locked(self, job_id: str, status: str, blob: Optional[bytes], compressed: bool) -> None:
+        # Caller holds self._lock
+        self._jobs[job_id] = (status, blob, compressed, time.time() + self.ttl)
+        self._jobs.move_to_end(job_id)
+        overflow = len(self._jobs) - self.max_jobs
+        if overflow <= 0:
+            return
+        # Evict the least recently used finished jobs; jobs still processing are never dropped,
+        # so a live job's poll cannot come back not_found
+        for old_id in [key for key, entry in self._jobs.items() if entry[0] != "processing"][:overflow]:
+            del self._jobs[old_id]
+
+
+class SqliteJobStore(JobStore):
+    """SQLite (WAL mode) store shared by every worker process on the host.
+
+    Lookups go through the job_id primary key; a partial index on expires_at
+    keeps sweeps cheap.
+    """
+
+    def __init__(self, path: str, max_jobs: int = 10000, ttl: float = 86400) -> None:
+        super().__init__(ttl)
+        self.path = path
+        self.max_jobs = max_jobs
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " result BLOB,"
+            " compressed INTEGER NOT NULL DEFAULT 0,"
+            " updated_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite connections are not shareable across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_id: str) -> None:
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, result, compressed, updated_at, expires_at)"
+                " VALUES (?, 'processing', NULL, 0, ?, ?)",
+                (job_id, now, now + self.ttl)
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT status, result, compressed FROM jobs WHERE job_id = ? AND expires_at >= ?",
+            (job_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        status, blob, compressed = row
+        return {"status": status, "result": _decode_result(blob, bool(compressed))}
+
+    def finish(self, job_id: str, status: str, result: Any) -> bool:
+        blob, compressed = _encode_result(result)
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, compressed = ?, updated_at = ?, expires_at = ?"
+                " WHERE job_id = ? AND status = 'processing'",
+                (status, blob, int(compressed), now, now + self.ttl, job_id)
+            )
+        return cursor.rowcount == 1
+
+    def delete(self, job_id: str) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def sweep(self) -> int:
+        conn = self._conn()
+        with conn:
+            removed = conn.execute("DELETE FROM jobs WHERE expires_at < ?", (time.time(),)).rowcount
+            # Enforce the size bound by dropping the least recently updated finished jobs
+            removed += conn.execute(
+                "DELETE FROM jobs WHERE job_id IN ("
+                " SELECT job_id FROM jobs WHERE status != 'processing' ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_jobs,)
+            ).rowcount
+        return removed
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def create_job_store() -> JobStore:
+    """Build the job store selected by JOB_STORE ("memory" or "sqlite")."""
+    backend = os.getenv("JOB_STORE", "memory").lower()
+    max_jobs = int(os.getenv("JOB_STORE_MAX_JOBS", "1000"))
+    ttl = float(os.getenv("JOB_TTL", "86400"))
+    if backend == "sqlite":
+        return SqliteJobStore(os.getenv("JOB_STORE_PATH", "jobs.db"), max_jobs=max_jobs, ttl=ttl)
+    if backend == "memory":
+        return MemoryJobStore(max_jobs=max_jobs, ttl=ttl)
+    raise ValueError(f"Unknown JOB_STORE '{backend}', expected 'memory' or 'sqlite'.")
+
+
+__all__ = ["JobStore", "MemoryJobStore", "SqliteJobStore", "create_job_store"]
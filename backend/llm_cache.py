@@ -0,0 +1,136 @@
+# backend/llm_cache.py
+# Content-addressed cache of LLM completions, with strict record / replay modes
+# for deterministic offline runs.
+import hashlib
+import json
+import os
+import time
+from typing import Any, Optional
+
+from backend.cache import MISSING, TTLCache
+from backend.instrumentation import estimate_tokens
+from backend.metrics import Counter
+
+# "off", "cache" (read-through), "record" (always call the model and store the
+# answer) or "replay" (answer only from the cache; a miss is an error)
+LLM_CACHE_MODE = os.getenv("LLM_CACHE", "off").lower()
+# Modes whose point is a recording another process can replay, so they need LLM_CACHE_PATH
+PERSISTENT_MODES = ("record", "replay")
+# Recorded completions never expire, so fixtures stay replayable
+_RECORD_TTL = 100 * 365 * 86400
+
+llm_cache_requests = Counter(
+    "llm_cache_requests_total",
+    "LLM completions by cache outcome: hit, miss (called and stored), recorded or replay_miss.",
+    ["model", "result"]
+)
+llm_cache_saved_ms = Counter(
+    "llm_cache_saved_ms_total",
+    "Completion latency avoided by cache hits, as measured when each answer was first produced.",
+    ["model"]
+)
+llm_cache_saved_tokens = Counter(
+    "llm_cache_saved_tokens_total",
+    "Estimated LLM tokens (characters / 4) not sent or received thanks to cache hits.",
+    ["model", "direction"]
+)
+
+
+class LLMCacheMiss(RuntimeError):
+    """Replay mode found no recorded completion for a request."""
+
+
+def create_llm_cache(mode: str = LLM_CACHE_MODE, path: Optional[str] = None) -> Optional[TTLCache]:
+    """The completion cache for mode (None when "off"); path defaults to LLM_CACHE_PATH.
+
+    Raises ValueError for an unknown mode, or for record / replay without a
+    path: the in-memory LRU alone would lose the recording when the process
+    exits, and a replay in another process would miss on every request.
+    """
+    if mode == "off":
+        return None
+    if mode not in ("cache",) + PERSISTENT_MODES:
+        raise ValueError(f"Unknown LLM_CACHE '{mode}', expected 'off', 'cache', 'record' or 'replay'.")
+    path = path or os.getenv("LLM_CACHE_PATH") or None
+    if mode in PERSISTENT_MODES and not path:
+        raise ValueError(f"LLM_CACHE={mode} needs LLM_CACHE_PATH, the SQLite file holding the recording.")
+    return TTLCache(
+        "llm",
+        max_entries=int(os.getenv("LLM_CACHE_SIZE", "2000")),
+        ttl=float(os.getenv("LLM_CACHE_TTL", "86400")),
+        path=path,
+        # A recording is only useful whole, so it is never trimmed
+        max_persisted=0 if mode in PERSISTENT_MODES else None
+    )
+
+
+llm_cache = create_llm_cache()
+
+
+def completion_key(model_name: str, messages: Any, args: tuple = (), kwargs: Optional[dict] = None) -> str:
+    """SHA-256 over the model name, the full message list and any extra parameters."""
+    payload = json.dumps(
+        {"model": model_name, "messages": messages, "args": list(args), "kwargs": kwargs or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachingModel:
+    """Wraps an agentpro model so identical chat_completion requests are answered from llm_cache.
+
+    Every ReAct iteration re-sends the whole conversation, and trips planned
+    by different users share system prompts and tool observations, so equal
+    requests recur. All other attributes are delegated to the wrapped model.
+    """
+
+    def __init__(self, model: Any, model_name: str, cache: TTLCache, mode: str = LLM_CACHE_MODE) -> None:
+        if mode in PERSISTENT_MODES and not cache.path:
+            raise ValueError(f"{mode} mode needs a cache with a SQLite path.")
+        self._model = model
+        self.model_name = model_name
+        self.cache = cache
+        self.mode = mode
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_model":
+            raise AttributeError(name)
+        return getattr(self._model, name)
+
+    def chat_completion(self, messages, *args, **kwargs):
+        key = completion_key(self.model_name, messages, args, kwargs)
+        if self.mode != "record":
+            entry = self.cache.get(key)
+            if entry is not MISSING:
+                llm_cache_requests.inc(model=self.model_name, result="hit")
+                llm_cache_saved_ms.inc(entry["ms"], model=self.model_name)
+                llm_cache_saved_tokens.inc(entry["tokens_in"], model=self.model_name, direction="in")
+                llm_cache_saved_tokens.inc(entry["tokens_out"], model=self.model_name, direction="out")
+                return entry["response"]
+            if self.mode == "replay":
+                llm_cache_requests.inc(model=self.model_name, result="replay_miss")
+                raise LLMCacheMiss(f"No recorded {self.model_name} completion for request {key[:12]}.")
+
+        start = time.perf_counter()
+        response = self._model.chat_completion(messages, *args, **kwargs)
+        entry = {
+            "response": response,
+            "ms": round((time.perf_counter() - start) * 1000, 1),
+            "tokens_in": sum(estimate_tokens(message.get("content", "")) for message in messages),
+            "tokens_out": estimate_tokens(response)
+        }
+        self.cache.set(key, entry, ttl=_RECORD_TTL if self.mode == "record" else None)
+        llm_cache_requests.inc(model=self.model_name, result="recorded" if self.mode == "record" else "miss")
+        return response
+
+
+def cached_model(model: Any, model_name: str) -> Any:
+    """model wrapped in a CachingModel, or unchanged when LLM_CACHE is off."""
+    if llm_cache is None:
+        return model
+    return CachingModel(model, model_name, llm_cache)
+
+
+__all__ = ["CachingModel", "LLMCacheMiss", "LLM_CACHE_MODE", "cached_model", "completion_key", "create_llm_cache", "llm_cache"]
@@ -0,0 +1,139 @@
+# backend/metrics.py
+# Minimal Prometheus-style counters and histograms (no client library needed).
+import bisect
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Seconds; suits both ~50 ms Mapbox calls and multi-second LLM calls
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REGISTRY: List["_Metric"] = []
+# Callables returning extra exposition lines (gauges read from live objects)
+COLLECTORS: List[Callable[[], List[str]]] = []
+
+
+def _label_key(labelnames: Sequence[str], labels: dict) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames: Sequence[str], key: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(labelnames, key)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic counter, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self, **labels) -> dict:
+        """Count and sum for one label set."""
+        series = self._series.get(_label_key(self.labelnames, labels))
+        if series is None:
+            return {"count": 0, "sum": 0.0}
+        return {"count": series[-1], "sum": series[-2]}
+
+    def samples(self) -> List[Tuple[dict, dict]]:
+        """(labels, {"count", "sum"}) for every label set observed so far."""
+        with self._lock:
+            return [(dict(zip(self.labelnames, key)), {"count": series[-1], "sum": series[-2]})
+                    for key, series in self._series.items()]
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+def register_collector(collector: Callable[[], List[str]]) -> None:
+    COLLECTORS.append(collector)
+
+
+def gauge_lines(name: str, help_text: str, values: Dict[str, float], label: str = "") -> List[str]:
+    """Exposition lines for a gauge, one sample per label value (or a single unlabeled sample)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for label_value, value in values.items():
+        suffix = f'{{{label}="{label_value}"}}' if label else ""
+        lines.append(f"{name}{suffix} {value}")
+    return lines
+
+
+def render_prometheus() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for collector in COLLECTORS:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+__all__ = ["Counter", "Histogram", "REGISTRY", "gauge_lines", "register_collector", "render_prometheus"]
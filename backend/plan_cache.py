@@ -0,0 +1,81 @@
+# backend/plan_cache.py
+# Maps normalized trip parameters to the job that is producing / produced the itinerary.
+import os
+from typing import Any, Iterable, Optional
+
+from backend.cache import MISSING, TTLCache
+from backend.job_store import JobStore
+from backend.metrics import Counter
+from backend.tools.geocoding_tool import normalize_query
+
+PLAN_CACHE_ENABLED = os.getenv("PLAN_CACHE", "1") == "1"
+
+plan_requests = Counter(
+    "plan_cache_requests_total",
+    "Itinerary requests by plan cache outcome: hit (completed job reused), coalesced (joined an in-flight job) or miss.",
+    ["kind", "outcome"]
+)
+
+
+def _number(value: Any) -> str:
+    try:
+        return f"{float(value):g}"
+    except (TypeError, ValueError):
+        return str(value).strip().casefold()
+
+
+def plan_key(kind: str, from_loc: str, to_loc: str, duration: Any, driving_hours: Any, options: Iterable[str] = ()) -> str:
+    """Cache key for a trip; options are the route preference or the (unordered) preferences list."""
+    parts = [
+        kind,
+        normalize_query(from_loc),
+        normalize_query(to_loc),
+        _number(duration),
+        _number(driving_hours),
+        ",".join(sorted(str(option).strip().casefold() for option in options))
+    ]
+    return "|".join(parts)
+
+
+class PlanCache:
+    """Single-flight plan cache on top of the job store.
+
+    A key points at the job started for it. Requests for the same key get that
+    job id back while it is processing (coalesced) or after it completed (hit);
+    failed or expired jobs are treated as misses so the trip is planned again.
+    """
+
+    def __init__(self, jobs: JobStore, max_entries: int = 2000, ttl: float = 21600, path: Optional[str] = None) -> None:
+        self.jobs = jobs
+        self._keys = TTLCache("plans", max_entries=max_entries, ttl=ttl, path=path)
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the job id to reuse for key, or None if a new job is needed."""
+        kind = key.split("|", 1)[0]
+        job_id = self._keys.get(key)
+        if job_id is not MISSING:
+            job = self.jobs.get(job_id)
+            if job is not None and job["status"] in ("processing", "completed"):
+                plan_requests.inc(kind=kind, outcome="hit" if job["status"] == "completed" else "coalesced")
+                return job_id
+        return None
+
+    def remember(self, key: str, job_id: str) -> None:
+        kind = key.split("|", 1)[0]
+        plan_requests.inc(kind=kind, outcome="miss")
+        self._keys.set(key, job_id)
+
+
+def create_plan_cache(jobs: JobStore) -> Optional[PlanCache]:
+    """Plan cache configured from PLAN_CACHE* env vars, or None when disabled."""
+    if not PLAN_CACHE_ENABLED:
+        return None
+    return PlanCache(
+        jobs,
+        max_entries=int(os.getenv("PLAN_CACHE_SIZE", "2000")),
+        ttl=float(os.getenv("PLAN_CACHE_TTL", "21600")),
+        path=os.getenv("PLAN_CACHE_PATH") or None
+    )
+
+
+__all__ = ["PlanCache", "create_plan_cache", "plan_key", "plan_requests"]
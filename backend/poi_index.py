@@ -0,0 +1,315 @@
+# backend/poi_index.py
+# Local index of geocoded POIs and overnight cities, seeded from a bundled file and
+# grown from geocode-checked places of completed itineraries, with vectorized
+# "along this route" queries.
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from backend.metrics import Counter, gauge_lines, register_collector
+from backend.tools.geocoding_tool import geocode_many, normalize_query
+
+# Matches the preference choices offered by the trip form
+CATEGORIES = ("Natural Scenery", "Foodie", "Culture", "City")
+POI_INDEX_PATH = os.getenv("POI_INDEX_PATH") or None
+POI_SEED_PATH = os.getenv("POI_SEED_PATH", os.path.join(os.path.dirname(__file__), "data", "poi_seed.json"))
+# A harvested place is kept only if geocoding its name lands this close to the itinerary's coordinates
+POI_VERIFY_KM = float(os.getenv("POI_VERIFY_KM", "10"))
+# Bound and lifetime of harvested places; seed places are never dropped
+POI_HARVEST_MAX_PLACES = int(os.getenv("POI_HARVEST_MAX_PLACES", "5000"))
+POI_HARVEST_TTL = float(os.getenv("POI_HARVEST_TTL", str(30 * 86400)))
+# Source label of harvested places
+HARVESTED = "geocoded"
+# Places closer than this (in degrees, ~100 m) with the same name are one entry
+_PRECISION = 3
+_KM_PER_DEG_LAT = 110.574
+_KM_PER_DEG_LON = 111.320
+
+# Checked in order; anything unmatched takes the trip's first preference
+_KEYWORDS = (
+    ("Foodie", ("restaurant", "cafe", "café", "diner", "bbq", "barbecue", "market", "bakery", "brewery", "winery",
+                "food", "taco", "pizza", "coffee", "doughnut", "donut", "eatery", "bistro", "grill", "tasting")),
+    ("Culture", ("museum", "historic", "history", "pueblo", "mission", "gallery", "observatory", "heritage",
+                 "cathedral", "church", "theater", "theatre", "art ", "arts", "memorial", "library", "temple", "route 66")),
+    ("City", ("downtown", "district", "street", "plaza", "square", "skyline", "pier", "tower", "nightlife", "strip",
+              "boardwalk", "waterfront", "bridge")),
+    ("Natural Scenery", ("national park", "state park", "canyon", "falls", "lake", "trail", "mountain", "beach",
+                         "river", "forest", "overlook", "viewpoint", "dunes", "hot spring", "valley", "gorge")),
+)
+
+poi_queries = Counter("poi_index_queries_total", "Corridor queries against the local POI index.", ["result"])
+poi_harvested = Counter(
+    "poi_index_harvested_total",
+    "Places from completed itineraries, by result: kept (geocoding confirmed them) or rejected.",
+    ["result"]
+)
+
+# Harvests geocode every place, so they run off the agent threads
+_harvest_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="poi-harvest")
+
+
+def _distance_km(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    # Equirectangular approximation; exact enough for a few-km tolerance
+    x = (lon2 - lon1) * _KM_PER_DEG_LON * math.cos(math.radians((lat1 + lat2) / 2))
+    y = (lat2 - lat1) * _KM_PER_DEG_LAT
+    return math.hypot(x, y)
+
+
+def classify(name: str, description: str = "", default: Optional[str] = None) -> str:
+    """Best-guess preference category for a place from its name and description."""
+    text = f" {name} {description} ".casefold()
+    for category, words in _KEYWORDS:
+        if any(word in text for word in words):
+            return category
+    return default if default in CATEGORIES else "Natural Scenery"
+
+
+class PoiIndex:
+    """Places kept in memory as coordinate arrays, optionally persisted to SQLite.
+
+    Each place is a dict with name, kind ("poi" or "city"), category, lon,
+    lat and description. Corridor queries project everything onto a local
+    flat plane and measure distances to every route segment at once.
+    Harvested places are capped at POI_HARVEST_MAX_PLACES (oldest dropped
+    first) and expire after POI_HARVEST_TTL seconds.
+    """
+
+    def __init__(self, path: Optional[str] = None, seed_path: Optional[str] = None) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._places = {}  # key -> place
+        self._updated = {}  # key -> last harvest time, for harvested places only
+        self._arrays = None  # (places list, coords (n, 2) array), rebuilt after changes
+        if path:
+            conn = self._conn()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS places ("
+                " key TEXT PRIMARY KEY,"
+                " name TEXT NOT NULL,"
+                " kind TEXT NOT NULL,"
+                " category TEXT NOT NULL,"
+                " lon REAL NOT NULL,"
+                " lat REAL NOT NULL,"
+                " description TEXT NOT NULL,"
+                " source TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            rows = conn.execute("SELECT key, name, kind, category, lon, lat, description, source, updated_at FROM places").fetchall()
+            for key, name, kind, category, lon, lat, description, source, updated_at in rows:
+                self._places[key] = {"name": name, "kind": kind, "category": category, "lon": lon, "lat": lat, "description": description}
+                if source == HARVESTED:
+                    self._updated[key] = updated_at
+            self._prune()
+        if not self._places and seed_path and os.path.exists(seed_path):
+            with open(seed_path, encoding="utf-8") as f:
+                self.add(json.load(f), source="seed")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    def add(self, places: Iterable[dict], source: str = HARVESTED) -> int:
+        """Insert or refresh places; returns how many were added. Invalid coordinates are skipped.
+
+        Harvested places never replace a seed place with the same key.
+        """
+        rows = []
+        for place in places:
+            lon, lat = float(place["lon"]), float(place["lat"])
+            if not (-180 <= lon <= 180 and -90 <= lat <= 90) or not place.get("name"):
+                continue
+            entry = {
+                "name": str(place["name"]).strip(),
+                "kind": place.get("kind", "poi"),
+                "category": place.get("category") if place.get("category") in CATEGORIES else classify(place["name"], place.get("description", "")),
+                "lon": lon,
+                "lat": lat,
+                "description": place.get("description", "")
+            }
+            rows.append((f"{normalize_query(entry['name'])}|{round(lon, _PRECISION)},{round(lat, _PRECISION)}", entry))
+        now = time.time()
+        with self._lock:
+            if source == HARVESTED:
+                rows = [(key, entry) for key, entry in rows if key not in self._places or key in self._updated]
+            for key, entry in rows:
+                self._places[key] = entry
+                if source == HARVESTED:
+                    self._updated[key] = now
+            self._arrays = None
+        if self.path and rows:
+            conn = self._conn()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO places (key, name, kind, category, lon, lat, description, source, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(key, e["name"], e["kind"], e["category"], e["lon"], e["lat"], e["description"], source, now) for key, e in rows]
+                )
+        if source == HARVESTED:
+            self._prune()
+        return len(rows)
+
+    def _prune(self) -> None:
+        # Drop expired harvested places, then the oldest ones beyond the cap
+        cutoff = time.time() - POI_HARVEST_TTL
+        with self._lock:
+            by_age = sorted(self._updated, key=self._updated.get)
+            dropped = [key for key in by_age if self._updated[key] < cutoff]
+            kept = by_age[len(dropped):]
+            dropped += kept[:max(0, len(kept) - POI_HARVEST_MAX_PLACES)]
+            for key in dropped:
+                del self._places[key]
+                del self._updated[key]
+            if dropped:
+                self._arrays = None
+        if self.path and dropped:
+            conn = self._conn()
+            with conn:
+                conn.executemany("DELETE FROM places WHERE key = ?", [(key,) for key in dropped])
+
+    def _snapshot(self):
+        with self._lock:
+            if self._arrays is None:
+                places = list(self._places.values())
+                coords = np.array([[p["lon"], p["lat"]] for p in places], dtype=float).reshape(-1, 2)
+                self._arrays = (places, coords)
+            return self._arrays
+
+    def corridor(
+        self,
+        line: Sequence[Sequence[float]],
+        radius_km: float = 25.0,
+        categories: Optional[Sequence[str]] = None,
+        kind: Optional[str] = None,
+        limit: int = 20
+    ) -> List[dict]:
+        """Places within radius_km of the polyline [[lon, lat], ...], ordered along the route.
+
+        Each result is the place plus distance_km (off the route) and
+        along_km (from the start of the route to the nearest point).
+        """
+        places, coords = self._snapshot()
+        route = np.asarray(line, dtype=float).reshape(-1, 2)
+        if not len(places) or not len(route):
+            poi_queries.inc(result="empty")
+            return []
+
+        # Equirectangular projection around the route's mean latitude; fine at corridor scale
+        scale = np.array([_KM_PER_DEG_LON * math.cos(math.radians(float(route[:, 1].mean()))), _KM_PER_DEG_LAT])
+        route_xy = route * scale
+        low, high = route_xy.min(axis=0) - radius_km, route_xy.max(axis=0) + radius_km
+        xy = coords * scale
+        mask = np.all((xy >= low) & (xy <= high), axis=1)
+        if categories:
+            mask &= np.isin([p["category"] for p in places], list(categories))
+        if kind:
+            mask &= np.array([p["kind"] == kind for p in places])
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            poi_queries.inc(result="empty")
+            return []
+
+        points = xy[candidates]
+        if len(route_xy) == 1:
+            starts, vectors = route_xy, np.zeros((1, 2))
+        else:
+            starts, vectors = route_xy[:-1], np.diff(route_xy, axis=0)
+        lengths_sq = np.maximum((vectors ** 2).sum(axis=1), 1e-12)
+        offsets = points[:, None, :] - starts[None, :, :]  # (points, segments, 2)
+        t = np.clip((offsets * vectors[None]).sum(axis=2) / lengths_sq, 0.0, 1.0)
+        distances = np.linalg.norm(offsets - t[..., None] * vectors[None], axis=2)
+        nearest = distances.argmin(axis=1)
+        off_route = distances[np.arange(len(points)), nearest]
+        segment_start_km = np.concatenate([[0.0], np.cumsum(np.sqrt(lengths_sq))])[:len(starts)]
+        along = segment_start_km[nearest] + t[np.arange(len(points)), nearest] * np.sqrt(lengths_sq[nearest])
+
+        inside = np.flatnonzero(off_route <= radius_km)
+        # Closest to the route first when trimming, then returned in driving order
+        inside = inside[np.argsort(off_route[inside])][:limit]
+        inside = inside[np.argsort(along[inside])]
+        poi_queries.inc(result="hit" if len(inside) else "empty")
+        return [
+            dict(places[candidates[i]], distance_km=round(float(off_route[i]), 1), along_km=round(float(along[i]), 1))
+            for i in inside
+        ]
+
+    def harvest(self, days: Iterable[dict], preferences: Sequence[str] = (), access_token: Optional[str] = None) -> int:
+        """Add the POIs and overnight cities of a finished itinerary (parsed day dicts).
+
+        Their coordinates were written by the model, so each place is looked
+        up by name (cached, batched) and only kept, at the geocoded
+        coordinates, when the match lies within POI_VERIFY_KM of where the
+        itinerary put it. Without a Mapbox token nothing is added.
+        """
+        access_token = access_token or os.getenv("MAPBOX_ACCESS_TOKEN")
+        default = preferences[0] if preferences else None
+        places = []
+        for day in days:
+            for poi in day.get("pois", []):
+                places.append({
+                    "name": poi["name"],
+                    "kind": "poi",
+                    "category": classify(poi["name"], poi.get("description", ""), default),
+                    "lon": poi["lon"],
+                    "lat": poi["lat"],
+                    "description": poi.get("description", "")
+                })
+            coordinates = day.get("route_coordinates") or []
+            city = day.get("overnight") or day.get("route_to")
+            if city and len(coordinates) >= 2:
+                lon, lat = coordinates[-1]
+                places.append({"name": city, "kind": "city", "category": "City", "lon": lon, "lat": lat, "description": ""})
+        if not access_token or not places:
+            return 0
+
+        verified = []
+        for place, match in zip(places, geocode_many([place["name"] for place in places], access_token)):
+            if isinstance(match, dict) and _distance_km(place["lon"], place["lat"], match["longitude"], match["latitude"]) <= POI_VERIFY_KM:
+                verified.append(dict(place, lon=match["longitude"], lat=match["latitude"]))
+        poi_harvested.inc(len(verified), result="kept")
+        poi_harvested.inc(len(places) - len(verified), result="rejected")
+        return self.add(verified, source=HARVESTED)
+
+
+_index = {"current": None}
+_index_lock = threading.Lock()
+
+
+def get_poi_index() -> PoiIndex:
+    """The process-wide index, loaded (and seeded if empty) on first use."""
+    if _index["current"] is None:
+        with _index_lock:
+            if _index["current"] is None:
+                _index["current"] = PoiIndex(POI_INDEX_PATH, POI_SEED_PATH)
+    return _index["current"]
+
+
+def harvest_in_background(days: List[dict], preferences: Sequence[str] = ()) -> None:
+    """Queue PoiIndex.harvest() for a finished itinerary; failures only mean fewer known places."""
+    _harvest_pool.submit(lambda: get_poi_index().harvest(days, preferences))
+
+
+def _collect() -> List[str]:
+    index = _index["current"]
+    return gauge_lines("poi_index_places", "Places held in the local POI index.", {"": len(index) if index else 0})
+
+
+register_collector(_collect)
+
+
+__all__ = ["CATEGORIES", "PoiIndex", "classify", "get_poi_index", "harvest_in_background"]
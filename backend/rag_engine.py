@@ -0,0 +1,252 @@
+# backend/rag_engine.py
+# Local retrieval over text guides: incremental index builds and a process-wide,
+# load-once engine answering batches of queries.
+import hashlib
+import json
+import os
+import pickle
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RAG_INDEX_PATH = os.getenv("RAG_INDEX_PATH", os.path.join(_REPO_ROOT, "RAG", "index"))
+# Directories (os.pathsep-separated) whose .txt / .md files are indexed
+RAG_SOURCES = os.getenv("RAG_SOURCES", os.path.join(_REPO_ROOT, "RAG"))
+RAG_CHUNK_SIZE = int(os.getenv("RAG_CHUNK_SIZE", "500"))
+RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "100"))
+# Up to this many chunks are searched exactly with one sparse product; larger
+# corpora also get an approximate Annoy index over an SVD projection
+RAG_SPARSE_MAX_CHUNKS = int(os.getenv("RAG_SPARSE_MAX_CHUNKS", "50000"))
+RAG_DENSE_DIM = int(os.getenv("RAG_DENSE_DIM", "256"))
+
+_N_FEATURES = 2 ** 18
+_SOURCE_SUFFIXES = (".txt", ".md")
+_MANIFEST = "manifest.json"
+
+
+def _vectorizer() -> HashingVectorizer:
+    # Stateless, so chunks vectorized in earlier builds stay valid; IDF is applied at load time
+    return HashingVectorizer(n_features=_N_FEATURES, alternate_sign=False, norm=None, stop_words="english")
+
+
+def split_text(text: str, chunk_size: int = RAG_CHUNK_SIZE, overlap: int = RAG_CHUNK_OVERLAP) -> List[str]:
+    """Pack lines into chunks of about chunk_size characters, repeating up to overlap characters."""
+    units = []
+    for line in text.splitlines():
+        words = line.split()
+        while words:
+            # Break overlong lines on word boundaries
+            unit, words = words[:1], words[1:]
+            while words and len(" ".join(unit + words[:1])) <= chunk_size:
+                unit, words = unit + words[:1], words[1:]
+            units.append(" ".join(unit))
+
+    chunks, current = [], []
+    for unit in units:
+        if current and len("\n".join(current + [unit])) > chunk_size:
+            chunks.append("\n".join(current))
+            carried = []
+            for previous in reversed(current):
+                if len("\n".join([previous] + carried)) > overlap:
+                    break
+                carried.insert(0, previous)
+            while carried and len("\n".join(carried + [unit])) > chunk_size:
+                carried.pop(0)
+            current = carried
+        current.append(unit)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _source_files(sources: str, index_dir: str) -> Dict[str, str]:
+    # relative name -> path for every indexable file (the index itself is skipped)
+    files = {}
+    for root_dir in filter(None, sources.split(os.pathsep)):
+        for dirpath, dirnames, filenames in os.walk(root_dir):
+            dirnames[:] = [d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) != os.path.abspath(index_dir)]
+            for filename in sorted(filenames):
+                if filename.endswith(_SOURCE_SUFFIXES):
+                    path = os.path.join(dirpath, filename)
+                    files[os.path.relpath(path, root_dir)] = path
+    return files
+
+
+def _write_json(path: str, value) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(value, f)
+    os.replace(tmp, path)
+
+
+def _stored_chunks(base: str):
+    # Chunk texts of a complete stored entry; None when the .npz or .json is missing or unreadable,
+    # e.g. after an interrupted build, so the entry is rebuilt instead of failing
+    if not os.path.exists(base + ".npz"):
+        return None
+    try:
+        with open(base + ".json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_index(sources: str = RAG_SOURCES, index_dir: str = RAG_INDEX_PATH, full: bool = False) -> dict:
+    """Bring the index in index_dir up to date with the source files.
+
+    Each file's chunks are stored under the hash of its content and chunking
+    settings, so only new or changed files are split and vectorized again
+    (everything when full=True) and chunks of deleted files are dropped.
+    Entries with a missing or unreadable half are treated as changed.
+    Returns counts of added, reused and removed files plus the chunk total.
+    """
+    chunk_dir = os.path.join(index_dir, "chunks")
+    os.makedirs(chunk_dir, exist_ok=True)
+    vectorizer = _vectorizer()
+    settings = f"{RAG_CHUNK_SIZE}:{RAG_CHUNK_OVERLAP}:{_N_FEATURES}"
+
+    manifest = {"sources": {}, "chunks": 0, "dense": False}
+    stats = {"added": 0, "reused": 0, "removed": 0}
+    for name, path in _source_files(sources, index_dir).items():
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        digest = hashlib.sha256(f"{settings}\n{text}".encode("utf-8")).hexdigest()
+        base = os.path.join(chunk_dir, digest)
+        chunks = None if full else _stored_chunks(base)
+        if chunks is None:
+            chunks = split_text(text)
+            _write_json(base + ".json", chunks)
+            sparse.save_npz(base + ".npz", vectorizer.transform(chunks).tocsr())
+            stats["added"] += 1
+        else:
+            stats["reused"] += 1
+        manifest["sources"][name] = {"sha256": digest, "chunks": len(chunks)}
+        manifest["chunks"] += len(chunks)
+
+    referenced = {entry["sha256"] for entry in manifest["sources"].values()}
+    for filename in os.listdir(chunk_dir):
+        if filename.split(".", 1)[0] not in referenced:
+            os.remove(os.path.join(chunk_dir, filename))
+            stats["removed"] += filename.endswith(".npz")
+
+    if manifest["chunks"] > RAG_SPARSE_MAX_CHUNKS:
+        _build_dense(index_dir, manifest)
+        manifest["dense"] = True
+    _write_json(os.path.join(index_dir, _MANIFEST), manifest)
+    stats["chunks"] = manifest["chunks"]
+    return stats
+
+
+def _load_chunks(index_dir: str, manifest: dict):
+    # (tf-idf matrix with L2-normalized rows, idf weights, chunk texts, chunk sources)
+    matrices, texts, origins = [], [], []
+    for name, entry in manifest["sources"].items():
+        base = os.path.join(index_dir, "chunks", entry["sha256"])
+        matrices.append(sparse.load_npz(base + ".npz"))
+        with open(base + ".json", encoding="utf-8") as f:
+            texts.extend(json.load(f))
+        origins.extend([name] * entry["chunks"])
+    counts = sparse.vstack(matrices, format="csr") if matrices else sparse.csr_matrix((0, _N_FEATURES))
+    document_frequency = np.bincount(counts.indices, minlength=_N_FEATURES)
+    idf = np.log((1 + counts.shape[0]) / (1 + document_frequency)) + 1
+    weights = sparse.diags(idf)
+    return normalize(counts @ weights), weights, texts, origins
+
+
+def _build_dense(index_dir: str, manifest: dict) -> None:
+    # Approximate neighbours for large corpora; Annoy indexes cannot be updated, so this is always rebuilt
+    from annoy import AnnoyIndex
+    from sklearn.decomposition import TruncatedSVD
+
+    matrix, _, _, _ = _load_chunks(index_dir, manifest)
+    svd = TruncatedSVD(n_components=RAG_DENSE_DIM).fit(matrix)
+    vectors = normalize(svd.transform(matrix))
+    annoy_index = AnnoyIndex(RAG_DENSE_DIM, "angular")
+    for i, vector in enumerate(vectors):
+        annoy_index.add_item(i, vector)
+    annoy_index.build(20)
+    annoy_index.save(os.path.join(index_dir, "dense.ann"))
+    with open(os.path.join(index_dir, "dense_svd.pkl"), "wb") as f:
+        pickle.dump(svd, f)
+
+
+class RagEngine:
+    """Index loaded once and kept resident; thread-safe for concurrent searches.
+
+    Small corpora are searched exactly with one sparse matrix product per
+    batch of queries. Corpora built with a dense index use the memory-mapped
+    Annoy file instead.
+    """
+
+    def __init__(self, index_dir: str = RAG_INDEX_PATH) -> None:
+        self.index_dir = index_dir
+        manifest_path = os.path.join(index_dir, _MANIFEST)
+        self.mtime = os.stat(manifest_path).st_mtime
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.vectorizer = _vectorizer()
+        self.matrix, self.weights, self.texts, self.sources = _load_chunks(index_dir, manifest)
+        self.svd = None
+        self.annoy = None
+        if manifest.get("dense"):
+            from annoy import AnnoyIndex
+
+            with open(os.path.join(index_dir, "dense_svd.pkl"), "rb") as f:
+                self.svd = pickle.load(f)
+            self.annoy = AnnoyIndex(RAG_DENSE_DIM, "angular")
+            self.annoy.load(os.path.join(index_dir, "dense.ann"))  # memory-mapped
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def search(self, queries: Sequence[str], k: int = 4) -> List[List[dict]]:
+        """Top-k chunks per query as [{"text", "source", "score"}, ...], best first."""
+        if not queries or not self.texts:
+            return [[] for _ in queries]
+        vectors = normalize(self.vectorizer.transform(queries) @ self.weights)
+        k = min(k, len(self.texts))
+        if self.annoy is not None:
+            results = []
+            for vector in normalize(self.svd.transform(vectors)):
+                ids, distances = self.annoy.get_nns_by_vector(vector, k, include_distances=True)
+                # Annoy's angular distance is sqrt(2 - 2 cos)
+                results.append([self._hit(i, 1 - d * d / 2) for i, d in zip(ids, distances)])
+            return results
+
+        scores = (vectors @ self.matrix.T).toarray()
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            ranked = candidates[np.argsort(-row[candidates])]
+            results.append([self._hit(i, row[i]) for i in ranked if row[i] > 0])
+        return results
+
+    def _hit(self, i: int, score: float) -> dict:
+        return {"text": self.texts[i], "source": self.sources[i], "score": round(float(score), 4)}
+
+
+_engine: Dict[str, Optional[RagEngine]] = {"current": None}
+_engine_lock = threading.Lock()
+
+
+def get_engine(index_dir: str = RAG_INDEX_PATH) -> Optional[RagEngine]:
+    """The process-wide engine, reloaded only when the index was rebuilt; None if no index exists."""
+    try:
+        mtime = os.stat(os.path.join(index_dir, _MANIFEST)).st_mtime
+    except OSError:
+        return None
+    engine = _engine["current"]
+    if engine is None or engine.index_dir != index_dir or engine.mtime != mtime:
+        with _engine_lock:
+            engine = _engine["current"]
+            if engine is None or engine.index_dir != index_dir or engine.mtime != mtime:
+                engine = _engine["current"] = RagEngine(index_dir)
+    return engine
+
+
+__all__ = ["RagEngine", "build_index", "get_engine", "split_text"]
@@ -0,0 +1,180 @@
+# backend/route_geometry.py
+# Route lines for the map: fetched from Mapbox outside the agents, simplified
+# per zoom level and served as encoded polylines.
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend import http_client
+from backend.cache import MISSING, TTLCache
+from backend.tools.directions_tool import DIRECTIONS_COORD_PRECISION
+
+# One simplified line is kept per zoom level; a vertex is dropped when it is
+# within ROUTE_GEOMETRY_TOLERANCE_PX pixels of the simplified line at that zoom
+ROUTE_GEOMETRY_ZOOMS = tuple(int(z) for z in os.getenv("ROUTE_GEOMETRY_ZOOMS", "4,7,10,13").split(","))
+ROUTE_GEOMETRY_TOLERANCE_PX = float(os.getenv("ROUTE_GEOMETRY_TOLERANCE_PX", "1.0"))
+ROUTE_GEOMETRY_MAX_WAYPOINTS = 25  # Mapbox Directions limit
+
+geometry_cache = TTLCache(
+    "route_geometry",
+    max_entries=int(os.getenv("ROUTE_GEOMETRY_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("ROUTE_GEOMETRY_CACHE_TTL", "86400")),
+    path=os.getenv("ROUTE_GEOMETRY_CACHE_PATH") or None
+)
+_prefetch_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ROUTE_GEOMETRY_PREFETCH_WORKERS", "2")),
+    thread_name_prefix="route-geometry"
+)
+
+
+def zoom_tolerance(zoom: int, latitude: float = 0.0) -> float:
+    """Degrees of latitude covered by ROUTE_GEOMETRY_TOLERANCE_PX web-mercator pixels at this zoom."""
+    return ROUTE_GEOMETRY_TOLERANCE_PX * 360.0 / (256 * 2 ** zoom) * math.cos(math.radians(latitude))
+
+
+def simplify(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker simplification of an (n, 2) array of lon/lat points.
+
+    Each split is vectorized over the points of its segment. Longitudes are
+    scaled by cos(mean latitude) so the tolerance (in degrees of latitude)
+    means the same ground distance in both directions.
+    """
+    count = len(points)
+    if count < 3 or tolerance <= 0:
+        return points
+    scale = math.cos(math.radians(float(points[:, 1].mean())))
+    xy = points * np.array([scale, 1.0])
+    keep = np.zeros(count, dtype=bool)
+    keep[[0, -1]] = True
+
+    stack = [(0, count - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = xy[end] - xy[start]
+        offsets = xy[start + 1:end] - xy[start]
+        length = math.hypot(segment[0], segment[1])
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return points[keep]
+
+
+def encode_polyline(points: np.ndarray, precision: int = 5) -> str:
+    """Encode lon/lat points in the Google polyline format (lat/lng order, as Leaflet and Mapbox expect)."""
+    scaled = np.round(points[:, ::-1] * 10 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    chars = []
+    for value in deltas.ravel().tolist():
+        value = ~(value << 1) if value < 0 else value << 1
+        while value >= 0x20:
+            chars.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        chars.append(chr(value + 63))
+    return "".join(chars)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[List[float]]:
+    """Inverse of encode_polyline: [[lon, lat], ...]."""
+    values, value, shift = [], 0, 0
+    for char in encoded:
+        byte = ord(char) - 63
+        value |= (byte & 0x1F) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    points, lat, lon = [], 0, 0
+    for lat_delta, lon_delta in zip(values[::2], values[1::2]):
+        lat += lat_delta
+        lon += lon_delta
+        points.append([lon / 10 ** precision, lat / 10 ** precision])
+    return points
+
+
+def _geometry_key(profile: str, waypoints: Sequence[Tuple[float, float]]) -> str:
+    return profile + "|" + ";".join(
+        f"{round(lon, DIRECTIONS_COORD_PRECISION)},{round(lat, DIRECTIONS_COORD_PRECISION)}" for lon, lat in waypoints
+    )
+
+
+def _fetch_line(waypoints: Sequence[Tuple[float, float]], access_token: str, profile: str) -> Optional[dict]:
+    coordinates = ";".join(f"{lon},{lat}" for lon, lat in waypoints)
+    url = f"{http_client.MAPBOX_API_BASE}/directions/v5/{profile}/{coordinates}"
+    params = {"access_token": access_token, "geometries": "geojson", "overview": "full"}
+    response = http_client.get(url, endpoint="mapbox.route_geometry", params=params)
+    response.raise_for_status()
+    data = response.json()
+    if data.get("code") == "NoRoute" or not data.get("routes"):
+        return None
+    if data.get("code") != "Ok":
+        raise ValueError(f"Directions API returned code {data.get('code')}.")
+    return data["routes"][0]
+
+
+def route_geometry(waypoints: Sequence[Tuple[float, float]], access_token: str, profile: str = "mapbox/driving") -> Optional[dict]:
+    """Simplified route line through the waypoints, one encoded polyline per zoom level.
+
+    Returns {"distance", "duration", "points", "bbox", "levels": [{"zoom",
+    "points", "polyline"}, ...]}, or None when Mapbox finds no route. Raises
+    ValueError for unusable waypoints or a non-Ok API code, and
+    httpx.HTTPError on API failures.
+    """
+    if not 2 <= len(waypoints) <= ROUTE_GEOMETRY_MAX_WAYPOINTS:
+        raise ValueError(f"Between 2 and {ROUTE_GEOMETRY_MAX_WAYPOINTS} coordinates are required.")
+    key = _geometry_key(profile, waypoints)
+    cached = geometry_cache.get(key)
+    if cached is not MISSING:
+        return cached
+
+    route = _fetch_line(waypoints, access_token, profile)
+    if route is None:
+        return None
+    line = np.asarray(route["geometry"]["coordinates"], dtype=float)
+    mid_latitude = float(line[:, 1].mean())
+    levels = []
+    for zoom in sorted(ROUTE_GEOMETRY_ZOOMS):
+        simplified = simplify(line, zoom_tolerance(zoom, mid_latitude))
+        levels.append({"zoom": zoom, "points": len(simplified), "polyline": encode_polyline(simplified)})
+    geometry = {
+        "distance": route.get("distance", 0),
+        "duration": route.get("duration", 0),
+        "points": len(line),
+        "bbox": [float(line[:, 0].min()), float(line[:, 1].min()), float(line[:, 0].max()), float(line[:, 1].max())],
+        "levels": levels
+    }
+    geometry_cache.set(key, geometry)
+    return geometry
+
+
+def pick_level(geometry: dict, zoom: Optional[int]) -> dict:
+    """Copy of geometry holding only the most detailed level not finer than zoom."""
+    levels = geometry["levels"]
+    if zoom is not None:
+        levels = [level for level in levels if level["zoom"] <= zoom][-1:] or levels[:1]
+    return dict(geometry, levels=levels)
+
+
+def prefetch_route_geometry(routes: Iterable[List[List[float]]], access_token: Optional[str] = None) -> None:
+    """Fill the cache for each day's route coordinates in the background."""
+    access_token = access_token or os.getenv("MAPBOX_ACCESS_TOKEN")
+    if not access_token:
+        return
+    for waypoints in routes:
+        if 2 <= len(waypoints) <= ROUTE_GEOMETRY_MAX_WAYPOINTS:
+            # Failures only mean the endpoint fetches the line on first request
+            _prefetch_pool.submit(route_geometry, [tuple(point) for point in waypoints], access_token)
+
+
+__all__ = ["decode_polyline", "encode_polyline", "pick_level", "prefetch_route_geometry", "route_geometry", "simplify", "zoom_tolerance"]
@@ -0,0 +1,93 @@
+# Async tool protocol for agentpro tools, plus a tool that runs several tool
+# actions of one agent step concurrently.
+from abc import ABC, abstractmethod
+from agentpro.tools import Tool
+from backend import http_client
+from backend.instrumentation import tool_span
+import asyncio
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+PARALLEL_ACTION = "run_tools_in_parallel"
+
+
+class AsyncTool(Tool, ABC):
+    """Tool whose work is the coroutine arun(); run() drives it on the shared tool loop.
+
+    Network calls inside arun go through http_client's async client, so
+    concurrent calls (from ParallelToolCalls or from different agents)
+    overlap their latency instead of holding one thread each.
+    """
+
+    @abstractmethod
+    async def arun(self, input_text: Any) -> Any:
+        """The tool's work, awaited on the tool loop."""
+
+    def run(self, input_text: Any) -> Any:
+        return http_client.run_coroutine(self.arun(input_text))
+
+
+async def call_tool(tool: Tool, input_text: Any) -> Any:
+    """Await an async tool, or run a blocking one in a worker thread."""
+    if isinstance(tool, AsyncTool):
+        return await tool.arun(input_text)
+    return await asyncio.to_thread(tool.run, input_text)
+
+
+def _as_text(result: Any) -> str:
+    # The geocoding tool answers with one line per address
+    return "\n".join(str(item) for item in result) if isinstance(result, list) else str(result)
+
+
+class ParallelToolCalls(Tool):
+    name: str = "Parallel Tool Calls"  # Human-readable name for the tool (used in documentation and debugging)
+    description: str = "Runs several independent actions of the other tools at the same time and returns every result. Use it when a step needs more than one lookup whose inputs do not depend on each other (e.g., geocoding and a web search)."  # Brief summary explaining the tool's functionality for agent
+    action_type: str = PARALLEL_ACTION  # Unique identifier for the tool; lowercase with underscores for agent; avoid spaces, digits, special characters
+    input_format: str = "An array of actions, each an object with the action_type and input of another tool, e.g. [{\"action_type\": \"geocode_addresses\", \"input\": [\"Denver, CO\"]}, {\"action_type\": \"search_text\", \"input\": \"best diners in Denver\"}]"  # Instruction on what kind of input the tool expects with example
+    tools: Dict[str, Any] = {}  # action_type -> tool instance this agent may call
+    on_step: Optional[Callable[[dict], None]] = None
+
+    def run(self, input_text: Any) -> str:
+        actions = input_text
+        if isinstance(actions, str):
+            try:
+                actions = json.loads(actions)
+            except ValueError:
+                return "Error: Input must be a JSON array of actions."
+        if isinstance(actions, dict):
+            actions = [actions]
+        if not isinstance(actions, list) or not actions:
+            return "Error: Input must be a non-empty array of actions."
+
+        calls: List[tuple] = []
+        for action in actions:
+            action_type = action.get("action_type") if isinstance(action, dict) else None
+            if action_type not in self.tools:
+                return f"Error: Unknown action_type '{action_type}'. Available: {', '.join(sorted(self.tools))}."
+            calls.append((action_type, action.get("input", "")))
+
+        for action_type, tool_input in calls:
+            if self.on_step is not None:
+                self.on_step({"type": "tool_call", "tool": action_type, "input": tool_input})
+        results = http_client.run_coroutine(self._gather(calls))
+        return "\n\n".join(
+            f"[{i}] {action_type}:\n{result}" for i, ((action_type, _), result) in enumerate(zip(calls, results), 1)
+        )
+
+    async def _gather(self, calls: List[tuple]) -> List[str]:
+        return await asyncio.gather(*(self._call(action_type, tool_input) for action_type, tool_input in calls))
+
+    async def _call(self, action_type: str, tool_input: Any) -> str:
+        # Each call gets its own span, just like a call made on its own step
+        with tool_span(action_type, tool_input) as span:
+            try:
+                result = _as_text(await call_tool(self.tools[action_type], tool_input))
+            except Exception as e:
+                result = f"Error running {action_type}: {e}"
+            span["output"] = result
+            if result.startswith("Error"):
+                span["error"] = result[:200]
+        return result
+
+
+__all__ = ["PARALLEL_ACTION", "AsyncTool", "ParallelToolCalls", "call_tool"]
@@ -1,33 +1,112 @@
 # Create custom tool for agentpro using DuckDuckGo Search API
-from agentpro.tools import Tool
+from backend.cache import MISSING, TTLCache
+from backend.instrumentation import estimate_tokens
+from backend.tools.async_tool import AsyncTool
+from backend.tools.geocoding_tool import normalize_query
+from concurrent.futures import ThreadPoolExecutor
 from ddgs import DDGS
-from typing import Any
+import asyncio
+import os
+import threading
+from typing import Any, List
 
-class DDGSTool(Tool):
+# Results per query, shared by every agent; popular queries ("best restaurants in
+# Flagstaff") are answered from here across trips and users
+search_cache = TTLCache(
+    "search",
+    max_entries=int(os.getenv("SEARCH_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "21600")),
+    path=os.getenv("SEARCH_CACHE_PATH") or None
+)
+
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "10"))
+# Queries searched at once across all agents
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "4"))
+# Upper bound on the (estimated) tokens one tool call hands back to the LLM,
+# split evenly between the queries of the call
+SEARCH_TOKEN_BUDGET = int(os.getenv("SEARCH_TOKEN_BUDGET", "1500"))
+SEARCH_BODY_CHARS = int(os.getenv("SEARCH_BODY_CHARS", "300"))
+
+_search_pool = ThreadPoolExecutor(max_workers=SEARCH_CONCURRENCY, thread_name_prefix="search")
+# Each pool thread keeps one client (and its HTTP session) for its lifetime
+_clients = threading.local()
+
+
+def _client() -> DDGS:
+    client = getattr(_clients, "ddgs", None)
+    if client is None:
+        client = _clients.ddgs = DDGS()
+    return client
+
+
+def search(query: str) -> List[dict]:
+    """Title/href/body results for a query, from the cache when possible; raises on search errors."""
+    key = normalize_query(query)
+    cached = search_cache.get(key)
+    if cached is not MISSING:
+        return cached
+    results = [
+        {"title": r.get("title", "No title"), "href": r.get("href", ""), "body": r.get("body", "No body")}
+        for r in _client().text(query, max_results=SEARCH_MAX_RESULTS) or []
+    ]
+    search_cache.set(key, results)
+    return results
+
+
+def parse_queries(input_text: Any) -> List[str]:
+    """A list of queries, or one query per line of a string; blanks and duplicates are dropped."""
+    items = input_text if isinstance(input_text, (list, tuple)) else str(input_text).splitlines()
+    queries = []
+    seen = set()
+    for item in items:
+        query = str(item).strip()
+        if query and normalize_query(query) not in seen:
+            seen.add(normalize_query(query))
+            queries.append(query)
+    return queries
+
+
+def format_results(results: List[dict], token_budget: int) -> str:
+    """Numbered results with trimmed bodies, stopping before the token budget is exceeded."""
+    blocks = []
+    used = 0
+    for i, r in enumerate(results, 1):
+        body = r["body"]
+        if len(body) > SEARCH_BODY_CHARS:
+            body = body[:SEARCH_BODY_CHARS].rsplit(" ", 1)[0] + "..."
+        block = f"Result {i}:\nTitle: {r['title']}\nBody: {body}"
+        cost = estimate_tokens(block)
+        if blocks and used + cost > token_budget:
+            break
+        blocks.append(block)
+        used += cost
+    return "\n\n".join(blocks)
+
+
+class DDGSTool(AsyncTool):
     name: str = "DuckDuckGo Search Tool"  # Human-readable name for the tool (used in documentation and debugging)
-    description: str = "Searches text using DuckDuckGo and returns titles and bodies of search results."  # Brief summary explaining the tool's functionality for agent
+    description: str = "Searches text using DuckDuckGo and returns titles and bodies of search results. Pass several queries at once to search them in parallel."  # Brief summary explaining the tool's functionality for agent
     action_type: str = "search_text"  # Unique identifier for the tool; lowercase with underscores for agent; avoid spaces, digits, special characters
-    input_format: str = "A search query string (e.g., 'python web scraping')"  # Instruction on what kind of input the tool expects with example
+    input_format: str = "A search query string (e.g., 'python web scraping'), or an array of query strings (e.g., ['best restaurants in Flagstaff', 'scenic stops near Flagstaff'])"  # Instruction on what kind of input the tool expects with example
 
-    def run(self, input_text: Any) -> str:
-        query = str(input_text).strip()
-        if not query:
+    async def arun(self, input_text: Any) -> str:
+        queries = parse_queries(input_text)
+        if not queries:
             return "Error: Search query cannot be empty."
-        
-        try:
-            with DDGS() as ddgs:
-                results = ddgs.text(query, max_results=10)  # Limit to 10 results
-            
-            if not results:
-                return "No search results found."
-            
-            output = ""
-            for i, r in enumerate(results, 1):
-                title = r.get('title', 'No title')
-                body = r.get('body', 'No body')
-                output += f"Result {i}:\nTitle: {title}\nBody: {body}\n\n"
-            
-            return output.strip()
-        
-        except Exception as e:
-            return f"Error performing search: {str(e)}"
+
+        budget = max(1, SEARCH_TOKEN_BUDGET // len(queries))
+        # The DDGS client is blocking, so searches stay on the search pool; awaiting
+        # them lets other tool calls of the same step proceed meanwhile
+        outcomes = await asyncio.gather(
+            *(asyncio.wrap_future(_search_pool.submit(search, query)) for query in queries),
+            return_exceptions=True
+        )
+        sections = []
+        for query, results in zip(queries, outcomes):
+            if isinstance(results, Exception):
+                output = f"Error performing search: {str(results)}"
+            else:
+                output = format_results(results, budget) if results else "No search results found."
+            sections.append(output if len(queries) == 1 else f"Query: {query}\n{output}")
+
+        return "\n\n".join(sections)
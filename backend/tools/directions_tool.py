@@ -1,16 +1,175 @@
 # Create custom tool for agentpro using Mapbox Directions API
-from agentpro.tools import Tool
-import requests
+from backend import http_client
+from backend.cache import MISSING, TTLCache
+from backend.metrics import Counter
+from backend.tools.async_tool import AsyncTool
+import asyncio
 import os
-from typing import Any
+from functools import partial
+from typing import Any, List, Optional, Tuple
 
-class DirectionsTool(Tool):
+# Coordinates are rounded to this many decimals (5 ~= 1 m) when building cache keys
+DIRECTIONS_COORD_PRECISION = int(os.getenv("DIRECTIONS_COORD_PRECISION", "5"))
+_cache_size = int(os.getenv("DIRECTIONS_CACHE_SIZE", "2000"))
+_cache_ttl = float(os.getenv("DIRECTIONS_CACHE_TTL", "86400"))
+_cache_path = os.getenv("DIRECTIONS_CACHE_PATH") or None
+
+# Whole routes keyed on profile + waypoint sequence
+directions_cache = TTLCache("directions", max_entries=_cache_size, ttl=_cache_ttl, path=_cache_path)
+# Individual legs (profile + from + to) taken from multi-waypoint responses
+leg_cache = TTLCache("directions_legs", max_entries=_cache_size * 10, ttl=_cache_ttl, path=_cache_path)
+
+# route key -> task fetching that route from Mapbox; only touched on the tool loop
+_in_flight = {}
+
+routes_from_legs = Counter(
+    "directions_routes_from_legs_total",
+    "Directions requests answered by combining cached legs instead of calling Mapbox."
+)
+
+
+def parse_coordinates(text: str) -> List[Tuple[float, float]]:
+    """Parse 'lon1,lat1;lon2,lat2;...' into (lon, lat) tuples; raises ValueError."""
+    coords_list = []
+    for pair in str(text).strip().strip("[]").split(';'):
+        lon, lat = map(float, pair.split(','))
+        coords_list.append((lon, lat))
+    return coords_list
+
+
+def _point_key(lon: float, lat: float) -> str:
+    return f"{round(lon, DIRECTIONS_COORD_PRECISION)},{round(lat, DIRECTIONS_COORD_PRECISION)}"
+
+
+def _leg_key(profile: str, start: Tuple[float, float], end: Tuple[float, float]) -> str:
+    return f"{profile}|{_point_key(*start)}|{_point_key(*end)}"
+
+
+def cached_leg(start: Tuple[float, float], end: Tuple[float, float], profile: str = "mapbox/driving") -> Any:
+    """The cached {"distance", "duration"} of the drive from start to end, or MISSING."""
+    return leg_cache.get(_leg_key(profile, start, end))
+
+
+def remember_leg(start: Tuple[float, float], end: Tuple[float, float], leg: dict, profile: str = "mapbox/driving") -> None:
+    """Cache a leg measured elsewhere (e.g. by the Matrix API) so routes through it can be answered locally."""
+    leg_cache.set(_leg_key(profile, start, end), leg)
+
+
+def _route_from_legs(profile: str, coords_list: List[Tuple[float, float]]) -> Optional[dict]:
+    # Any waypoint sequence whose consecutive pairs were all seen as legs can be answered locally
+    legs = []
+    for start, end in zip(coords_list, coords_list[1:]):
+        leg = leg_cache.get(_leg_key(profile, start, end))
+        if leg is MISSING:
+            return None
+        legs.append(leg)
+    return {
+        "distance": sum(leg["distance"] for leg in legs),
+        "duration": sum(leg["duration"] for leg in legs),
+        "legs": legs
+    }
+
+
+def _route_key(profile: str, coords_list: List[Tuple[float, float]]) -> str:
+    return profile + "|" + ";".join(_point_key(lon, lat) for lon, lat in coords_list)
+
+
+def _cached_route(route_key: str, profile: str, coords_list: List[Tuple[float, float]]):
+    # The route from the route cache or from cached legs, else MISSING
+    cached = directions_cache.get(route_key)
+    if cached is not MISSING:
+        return cached
+    route = _route_from_legs(profile, coords_list)
+    if route is not None:
+        routes_from_legs.inc()
+        directions_cache.set(route_key, route)
+        return route
+    return MISSING
+
+
+def _directions_url(profile: str, coords_list: List[Tuple[float, float]]) -> str:
+    # Build the directions URL (v5 API, driving profile)
+    coordinates = ';'.join(f"{lon},{lat}" for lon, lat in coords_list)
+    return f"{http_client.MAPBOX_API_BASE}/directions/v5/{profile}/{coordinates}"
+
+
+async def aget_route(coords_list: List[Tuple[float, float]], access_token: str, profile: str = "mapbox/driving") -> Optional[dict]:
+    """Best route through the waypoints as {"distance": m, "duration": s, "legs": [...]}.
+
+    Answers from the route cache, then from cached legs, and only then calls
+    Mapbox. Returns None when Mapbox finds no route. Raises httpx.HTTPError /
+    KeyError on API failures and ValueError when the API returns a non-Ok code.
+    """
+    route_key = _route_key(profile, coords_list)
+    route = _cached_route(route_key, profile, coords_list)
+    if route is not MISSING:
+        return route
+    # Concurrent requests for the same route (e.g. a job and its feasibility check) share one call
+    fetch = partial(_fetch_route, route_key, profile, coords_list, access_token)
+    return await asyncio.shield(http_client.start_once(_in_flight, route_key, fetch))
+
+
+async def _fetch_route(route_key: str, profile: str, coords_list: List[Tuple[float, float]], access_token: str) -> Optional[dict]:
+    params = {
+        "access_token": access_token
+    }
+    response = await http_client.aget(_directions_url(profile, coords_list), endpoint="mapbox.directions", params=params)
+    response.raise_for_status()  # Raise error for bad status codes
+    return _remember_route(route_key, profile, coords_list, response.json())
+
+
+def get_route(coords_list: List[Tuple[float, float]], access_token: str, profile: str = "mapbox/driving") -> Optional[dict]:
+    """Blocking aget_route()."""
+    return http_client.run_coroutine(aget_route(coords_list, access_token, profile))
+
+
+def _remember_route(route_key: str, profile: str, coords_list: List[Tuple[float, float]], data: dict) -> Optional[dict]:
+    # Parse the API answer and cache the route and each of its legs
+    if data.get("code") == "NoRoute":
+        return None
+    if data.get("code") != "Ok":
+        raise ValueError(f"Directions API returned code {data.get('code')}.")
+    routes = data.get("routes", [])
+    if not routes:
+        return None
+
+    # Get the first (best) route
+    best = routes[0]
+    legs = [{"distance": leg.get("distance", 0), "duration": leg.get("duration", 0)} for leg in best.get("legs", [])]
+    route = {"distance": best.get("distance", 0), "duration": best.get("duration", 0), "legs": legs}
+    directions_cache.set(route_key, route)
+    if len(legs) == len(coords_list) - 1:
+        for start, end, leg in zip(coords_list, coords_list[1:], legs):
+            leg_cache.set(_leg_key(profile, start, end), leg)
+    return route
+
+
+def summarize_route(route: dict) -> str:
+    """Total distance and duration, plus one line per leg when there are several."""
+    distance_km = route["distance"] / 1000
+    duration_min = route["duration"] / 60
+
+    # Basic summary
+    summary = f"Total route distance: {distance_km:.2f} km, Duration: {duration_min:.1f} minutes."
+
+    # Include legs summary if multiple waypoints
+    legs = route["legs"]
+    if len(legs) > 1:
+        summary += "\nLeg details:"
+        for i, leg in enumerate(legs):
+            leg_distance = leg["distance"] / 1000
+            leg_duration = leg["duration"] / 60
+            summary += f"\n  Leg {i+1}: {leg_distance:.2f} km, {leg_duration:.1f} min"
+    return summary
+
+
+class DirectionsTool(AsyncTool):
     name: str = "Mapbox Directions Tool"  # Human-readable name for the tool (used in documentation and debugging)
     description: str = "Gets driving directions between up to 25 coordinates using Mapbox API. Useful for routing and estimating travel time/distance."  # Brief summary explaining the tool's functionality for agent
     action_type: str = "get_directions"  # Unique identifier for the tool; lowercase with underscores for agent; avoid spaces, digits, special characters
     input_format: str = "A string of coordinates in the format 'longitude1,latitude1;longitude2,latitude2;longitude3,latitude3' (e.g., '-122.4194,37.7749;-118.2437,34.0522;-119.4179,36.7783') [up to 25 coordinates]"  # Instruction on what kind of input the tool expects with example
 
-    def run(self, input_text: Any) -> str:
+    async def arun(self, input_text: Any) -> str:
         # Get Mapbox access token from environment
         access_token = os.getenv("MAPBOX_ACCESS_TOKEN")
         if not access_token:
@@ -18,59 +177,21 @@ class DirectionsTool(Tool):
         
         # Parse input: expect "lon1,lat1;lon2,lat2;..."
         try:
-            coords_str = input_text.strip()
-            coord_pairs = coords_str.split(';')
-            if len(coord_pairs) < 2:
-                return "Error: At least two coordinates are required."
-            coords_list = []
-            for pair in coord_pairs:
-                lon, lat = map(float, pair.split(','))
-                coords_list.append((lon, lat))
+            coords_list = parse_coordinates(input_text)
         except ValueError:
             return "Error: Invalid coordinate format. Use 'longitude1,latitude1;longitude2,latitude2;...'."
-        
-        # Build the directions URL (v5 API, driving profile)
-        profile = "mapbox/driving"
-        coordinates = ';'.join(f"{lon},{lat}" for lon, lat in coords_list)
-        url = f"https://api.mapbox.com/directions/v5/{profile}/{coordinates}"
-        params = {
-            "access_token": access_token
-        }
+        if len(coords_list) < 2:
+            return "Error: At least two coordinates are required."
         
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()  # Raise error for bad status codes
-            data = response.json()
-            
-            if data.get("code") != "Ok":
-                return f"Error: Directions API returned code {data.get('code')}."
-            
-            routes = data.get("routes", [])
-            if not routes:
+            route = await aget_route(coords_list, access_token)
+            if route is None:
                 return "No routes found for the given coordinates."
-            
-            # Get the first (best) route
-            route = routes[0]
-            distance_m = route.get("distance", 0)
-            duration_s = route.get("duration", 0)
-            distance_km = distance_m / 1000
-            duration_min = duration_s / 60
-            
-            # Basic summary
-            summary = f"Total route distance: {distance_km:.2f} km, Duration: {duration_min:.1f} minutes."
-            
-            # Include legs summary if multiple waypoints
-            legs = route.get("legs", [])
-            if len(legs) > 1:
-                summary += "\nLeg details:"
-                for i, leg in enumerate(legs):
-                    leg_distance = leg.get("distance", 0) / 1000
-                    leg_duration = leg.get("duration", 0) / 60
-                    summary += f"\n  Leg {i+1}: {leg_distance:.2f} km, {leg_duration:.1f} min"
-            
-            return summary
+            return summarize_route(route)
         
-        except requests.RequestException as e:
+        except http_client.HTTP_ERRORS as e:
             return f"Error calling Mapbox API: {str(e)}"
+        except ValueError as e:
+            return f"Error: {str(e)}"
         except KeyError as e:
-            return f"Error parsing API response: {str(e)}"
\ No newline at end of file
+            return f"Error parsing API response: {str(e)}"
@@ -1,16 +1,207 @@
 # Create custom tool for agentpro using Mapbox Geocoding API
-from agentpro.tools import Tool
-import requests
+from backend import http_client
+from backend.cache import MISSING, TTLCache
+from backend.tools.async_tool import AsyncTool
+import asyncio
 import os
-from typing import Any
+import re
+import unicodedata
+from functools import partial
+from typing import Any, List, Optional, Union
 
-class GeocodingTool(Tool):
+# Shared by every GeocodingTool instance in the process; set GEOCODE_CACHE_PATH to persist it
+geocode_cache = TTLCache(
+    "geocode",
+    max_entries=int(os.getenv("GEOCODE_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("GEOCODE_CACHE_TTL", "86400")),
+    path=os.getenv("GEOCODE_CACHE_PATH") or None
+)
+# "No results" answers are cached for a shorter time
+GEOCODE_NEGATIVE_TTL = float(os.getenv("GEOCODE_NEGATIVE_TTL", "3600"))
+
+# Addresses resolved at once across all agents when a batch misses the cache
+GEOCODE_CONCURRENCY = int(os.getenv("GEOCODE_CONCURRENCY", "8"))
+# Every lookup runs on the tool loop, so one semaphore bounds them all
+_geocode_limit = asyncio.Semaphore(GEOCODE_CONCURRENCY)
+# Normalized query -> task looking it up; concurrent callers (e.g. a job and its
+# feasibility check) join it instead of asking Mapbox again
+_in_flight = {}
+
+# Mapbox's v6 batch endpoint takes up to 1000 queries per request; it is turned
+# off for the process if the token is not allowed to use it
+GEOCODE_BATCH_URL = f"{http_client.MAPBOX_API_BASE}/search/geocode/v6/batch"
+GEOCODE_BATCH_LIMIT = 1000
+_batch_state = {"available": os.getenv("GEOCODE_USE_BATCH", "1") == "1"}
+
+
+def normalize_query(address: str) -> str:
+    """Canonical cache key for an address: Unicode form, case, spacing and stray punctuation."""
+    text = unicodedata.normalize("NFKC", str(address)).casefold()
+    text = re.sub(r"\s*,\s*", ", ", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" ,.;")
+
+
+def _forward_request(address: str, access_token: str):
+    # Build the forward geocoding URL (v6 API)
+    url = f"{http_client.MAPBOX_API_BASE}/search/geocode/v6/forward"
+    params = {
+        "q": address,
+        "access_token": access_token,
+        "limit": 1  # Get the top result
+    }
+    return url, params
+
+
+async def ageocode(address: str, access_token: str) -> Optional[dict]:
+    """Forward-geocode one address, returning the top match or None if there are no results.
+
+    The match is a dict with name, place_formatted, longitude and latitude.
+    Raises httpx.HTTPError / KeyError on API failures, which are not cached.
+    """
+    key = normalize_query(address)
+    cached = geocode_cache.get(key)
+    if cached is not MISSING:
+        return cached
+
+    return await asyncio.shield(http_client.start_once(_in_flight, key, partial(_fetch, key, address, access_token)))
+
+
+async def _fetch(key: str, address: str, access_token: str) -> Optional[dict]:
+    url, params = _forward_request(address, access_token)
+    async with _geocode_limit:
+        response = await http_client.aget(url, endpoint="mapbox.geocode", params=params)
+    response.raise_for_status()  # Raise error for bad status codes
+    return _remember(key, response.json().get("features", []))
+
+
+def geocode(address: str, access_token: str) -> Optional[dict]:
+    """Blocking ageocode()."""
+    return http_client.run_coroutine(ageocode(address, access_token))
+
+
+def _remember(key: str, features: list) -> Optional[dict]:
+    # Extract details from the first feature and cache them (or the lack of results)
+    if not features:
+        geocode_cache.set(key, None, ttl=GEOCODE_NEGATIVE_TTL)
+        return None
+    feature = features[0]
+    longitude, latitude = feature["geometry"]["coordinates"]
+    place = {
+        "name": feature["properties"].get("name", "Unknown"),
+        "place_formatted": feature["properties"].get("place_formatted", ""),
+        "longitude": longitude,
+        "latitude": latitude
+    }
+    geocode_cache.set(key, place)
+    return place
+
+
+def _batch_chunks(addresses: List[str]):
+    # (chunk, request body) pairs within the endpoint's per-request limit
+    for start in range(0, len(addresses), GEOCODE_BATCH_LIMIT):
+        chunk = addresses[start:start + GEOCODE_BATCH_LIMIT]
+        yield chunk, [{"q": address, "limit": 1} for address in chunk]
+
+
+def _remember_batch(chunk: List[str], data: dict) -> List[Optional[dict]]:
+    # Batch results come back in request order
+    batch = data.get("batch", [])
+    if len(batch) != len(chunk):
+        raise KeyError("batch")
+    return [_remember(normalize_query(address), collection.get("features", [])) for address, collection in zip(chunk, batch)]
+
+
+async def _ageocode_batch(addresses: List[str], access_token: str) -> List[Optional[dict]]:
+    # One POST to the batch endpoint per chunk
+    places = []
+    for chunk, body in _batch_chunks(addresses):
+        response = await http_client.apost(GEOCODE_BATCH_URL, endpoint="mapbox.geocode_batch", params={"access_token": access_token}, json=body)
+        response.raise_for_status()
+        places.extend(_remember_batch(chunk, response.json()))
+    return places
+
+
+async def _batch_places(addresses: List[str], access_token: str) -> Optional[List[Optional[dict]]]:
+    # The batch results, or None when the batch endpoint failed and each address needs its own request
+    try:
+        return await _ageocode_batch(addresses, access_token)
+    except (*http_client.HTTP_ERRORS, KeyError, ValueError) as e:
+        _batch_failed(e)
+        return None
+
+
+async def _from_batch(batch: asyncio.Future, index: int, key: str, address: str, access_token: str) -> Optional[dict]:
+    places = await batch
+    if places is None:
+        return await _fetch(key, address, access_token)
+    return places[index]
+
+
+def _split_cached(addresses: List[str]):
+    # (keys in input order, key -> cached result, key -> first uncached address with that key)
+    keys = [normalize_query(address) for address in addresses]
+    resolved = {}
+    pending = {}
+    for key, address in zip(keys, addresses):
+        if key in resolved or key in pending:
+            continue
+        cached = geocode_cache.get(key)
+        if cached is MISSING:
+            pending[key] = address
+        else:
+            resolved[key] = cached
+    return keys, resolved, pending
+
+
+def _batch_failed(error: Exception) -> None:
+    # Not permitted for this token / plan: stop trying the batch endpoint
+    if isinstance(error, http_client.HTTP_STATUS_ERRORS) and error.response is not None \
+            and error.response.status_code in (401, 403, 404):
+        _batch_state["available"] = False
+
+
+async def ageocode_many(addresses: List[str], access_token: str) -> List[Union[dict, None, Exception]]:
+    """Geocode a batch of addresses, returning results in input order.
+
+    Each item is a match dict, None for no results, or the exception raised
+    for that address. Cached and duplicate addresses are resolved once, and
+    lookups already in flight are shared; the remaining ones go to the Mapbox
+    batch endpoint when it is available, and otherwise are requested
+    concurrently.
+    """
+    keys, resolved, pending = _split_cached(addresses)
+
+    # Misses another caller is already looking up are joined rather than batched again
+    fresh = {key: address for key, address in pending.items() if key not in _in_flight}
+    if len(fresh) > 1 and _batch_state["available"]:
+        batch = asyncio.ensure_future(_batch_places(list(fresh.values()), access_token))
+        for index, (key, address) in enumerate(fresh.items()):
+            http_client.start_once(_in_flight, key, partial(_from_batch, batch, index, key, address, access_token))
+
+    if pending:
+        # Known misses go straight to the lookup (or its batch); a second cache check would count them twice
+        flights = [
+            asyncio.shield(http_client.start_once(_in_flight, key, partial(_fetch, key, address, access_token)))
+            for key, address in pending.items()
+        ]
+        resolved.update(zip(pending, await asyncio.gather(*flights, return_exceptions=True)))
+
+    return [resolved[key] for key in keys]
+
+
+def geocode_many(addresses: List[str], access_token: str) -> List[Union[dict, None, Exception]]:
+    """Blocking ageocode_many(), for feasibility checks and the itinerary pipeline."""
+    return http_client.run_coroutine(ageocode_many(addresses, access_token))
+
+
+class GeocodingTool(AsyncTool):
     name: str = "Mapbox Geocoding Tool"  # Human-readable name for the tool (used in documentation and debugging)
     description: str = "Geocodes an array of addresses or place names to coordinates and location details using Mapbox API. Useful for finding latitude/longitude of multiple locations."  # Brief summary explaining the tool's functionality for agent
     action_type: str = "geocode_addresses"  # Unique identifier for the tool; lowercase with underscores for agent; avoid spaces, digits, special characters
     input_format: str = "An array of string addresses or place names to geocode"  # Instruction on what kind of input the tool expects with example
 
-    def run(self, input_text: Any) -> list[str]:
+    async def arun(self, input_text: Any) -> list[str]:
         # Check if input is a list
         if not isinstance(input_text, list):
             return ["Error: Input must be a list of addresses."]
@@ -21,37 +212,15 @@ class GeocodingTool(Tool):
             return ["Error: MAPBOX_ACCESS_TOKEN environment variable not set."]
         
         results = []
-        for address in input_text:
-            try:
-                # Build the forward geocoding URL (v6 API)
-                url = "https://api.mapbox.com/search/geocode/v6/forward"
-                params = {
-                    "q": address,
-                    "access_token": access_token,
-                    "limit": 1  # Get the top result
-                }
-                
-                response = requests.get(url, params=params)
-                response.raise_for_status()  # Raise error for bad status codes
-                data = response.json()
-                
-                features = data.get("features", [])
-                if not features:
-                    results.append(f"No geocoding results found for '{address}'.")
-                    continue
-                
-                # Extract details from the first feature
-                feature = features[0]
-                name = feature["properties"].get("name", "Unknown")
-                place_formatted = feature["properties"].get("place_formatted", "")
-                coordinates = feature["geometry"]["coordinates"]
-                longitude, latitude = coordinates
-                
-                results.append(f"Geocoded '{address}': {name}, {place_formatted}. Coordinates: {latitude}, {longitude}")
-            
-            except requests.RequestException as e:
-                results.append(f"Error calling Mapbox API for '{address}': {str(e)}")
-            except KeyError as e:
-                results.append(f"Error parsing API response for '{address}': {str(e)}")
+        addresses = [str(address) for address in input_text]
+        for address, place in zip(addresses, await ageocode_many(addresses, access_token)):
+            if isinstance(place, http_client.HTTP_ERRORS):
+                results.append(f"Error calling Mapbox API for '{address}': {str(place)}")
+            elif isinstance(place, Exception):
+                results.append(f"Error parsing API response for '{address}': {str(place)}")
+            elif place is None:
+                results.append(f"No geocoding results found for '{address}'.")
+            else:
+                results.append(f"Geocoded '{address}': {place['name']}, {place['place_formatted']}. Coordinates: {place['latitude']}, {place['longitude']}")
         
-        return results
\ No newline at end of file
+        return results
@@ -1,16 +1,16 @@
 # Create custom tool for agentpro using Linkup Search API
-from agentpro.tools import Tool
-import requests
+from backend import http_client
+from backend.tools.async_tool import AsyncTool
 import os
 from typing import Any
 
-class LinkupTool(Tool):
+class LinkupTool(AsyncTool):
     name: str = "Linkup Search Tool"  # Human-readable name for the tool (used in documentation and debugging)
     description: str = "Searches the web using Linkup API to get sourced answers and information."  # Brief summary explaining the tool's functionality for agent
     action_type: str = "search_linkup"  # Unique identifier for the tool; lowercase with underscores for agent; avoid spaces, digits, special characters
     input_format: str = "A search query string, e.g., 'What is Microsoft's 2024 revenue?'"  # Instruction on what kind of input the tool expects with example
 
-    def run(self, input_text: Any) -> str:
+    async def arun(self, input_text: Any) -> str:
         # Get Linkup API token from environment
         token = os.getenv("LINKUP_API_TOKEN")
         if not token:
@@ -33,7 +33,7 @@ class LinkupTool(Tool):
         }
         
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = await http_client.apost(url, endpoint="linkup.search", json=payload, headers=headers)
             response.raise_for_status()  # Raise error for bad status codes
             data = response.json()
             
@@ -50,7 +50,7 @@ class LinkupTool(Tool):
             
             return result
         
-        except requests.RequestException as e:
+        except http_client.HTTP_ERRORS as e:
             return f"Error calling Linkup API: {str(e)}"
         except KeyError as e:
             return f"Error parsing API response: {str(e)}"
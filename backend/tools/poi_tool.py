@@ -0,0 +1,63 @@
+# Create custom tool for agentpro over the local POI / overnight-city index
+from agentpro.tools import Tool
+from backend import http_client
+from backend.poi_index import CATEGORIES, get_poi_index
+from backend.route_geometry import decode_polyline, pick_level, route_geometry
+from backend.tools.directions_tool import parse_coordinates
+import json
+import os
+from typing import Any, List
+
+POI_CORRIDOR_RADIUS_KM = float(os.getenv("POI_CORRIDOR_RADIUS_KM", "25"))
+# Road lines at this zoom keep corridor distances within a few hundred metres
+_CORRIDOR_ZOOM = 10
+
+
+def route_line(waypoints: List[tuple]) -> List[List[float]]:
+    """Driving line through the waypoints from the (cached) route geometry; straight segments if unavailable."""
+    access_token = os.getenv("MAPBOX_ACCESS_TOKEN")
+    if access_token and len(waypoints) >= 2:
+        try:
+            geometry = route_geometry(waypoints, access_token)
+            if geometry is not None:
+                return decode_polyline(pick_level(geometry, _CORRIDOR_ZOOM)["levels"][0]["polyline"])
+        except (*http_client.HTTP_ERRORS, KeyError, ValueError):
+            pass
+    return [list(point) for point in waypoints]
+
+
+class PoiCorridorTool(Tool):
+    name: str = "Local POI Corridor Tool"  # Human-readable name for the tool (used in documentation and debugging)
+    description: str = "Finds known attractions, restaurants and overnight cities within a distance of a driving route from a local index, without any web search. Use it before searching the web."  # Brief summary explaining the tool's functionality for agent
+    action_type: str = "find_pois_along_route"  # Unique identifier for the tool; lowercase with underscores for agent; avoid spaces, digits, special characters
+    input_format: str = "A coordinate string 'longitude1,latitude1;longitude2,latitude2' for the route, or an object {\"coordinates\": \"lon1,lat1;lon2,lat2\", \"radius_km\": 25, \"categories\": [\"Natural Scenery\", \"Foodie\", \"Culture\", \"City\"], \"kind\": \"poi\" or \"city\"}"  # Instruction on what kind of input the tool expects with example
+
+    def run(self, input_text: Any) -> str:
+        request = input_text
+        if isinstance(request, str) and request.strip().startswith("{"):
+            try:
+                request = json.loads(request)
+            except ValueError:
+                return "Error: Input object is not valid JSON."
+        if not isinstance(request, dict):
+            request = {"coordinates": request}
+
+        try:
+            waypoints = parse_coordinates(request.get("coordinates", ""))
+            radius_km = float(request.get("radius_km", POI_CORRIDOR_RADIUS_KM))
+        except (TypeError, ValueError):
+            return "Error: Invalid coordinate format. Use 'longitude1,latitude1;longitude2,latitude2;...'."
+        categories = request.get("categories") or None
+        if isinstance(categories, str):
+            categories = [categories]
+        if categories and not set(categories) <= set(CATEGORIES):
+            return f"Error: Categories must be among {', '.join(CATEGORIES)}."
+
+        places = get_poi_index().corridor(route_line(waypoints), radius_km, categories, request.get("kind"))
+        if not places:
+            return f"No known places within {radius_km:g} km of this route. Search the web instead."
+        return "\n".join(
+            f"{p['name']} ({p['lon']},{p['lat']}) [{p['kind']}, {p['category']}]: {p['description'] or 'No description.'}"
+            f" {p['distance_km']:g} km off the route, {p['along_km']:g} km from its start."
+            for p in places
+        )
@@ -1,30 +1,29 @@
 #Create custom tool for agentPro
 from agentpro.tools import Tool
+from backend.rag_engine import get_engine
 from typing import Any
 
+RAG_RESULTS = 4
+
+
 class RagTool(Tool):
     name: str = "Local RAG Tool"  # Human-readable name for the tool (used in documentation and debugging)
-    description: str = "Contains most up to date information on everything cats, its use should be prioritized if question is related to cats."  # Brief summary explaining the tool's functionality for agent
+    description: str = "Searches the local knowledge base built from the text files in RAG/ (currently facts about cats) and returns the most relevant passages. Prioritize it for questions about cats."  # Brief summary explaining the tool's functionality for agent
     action_type: str = "local_rag"  # Unique identifier for the tool; lowercase with underscores for agent; avoid spaces, digits, special characters
-    input_format: str = "A string query"  # Instruction on what kind of input the tool expects with example
+    input_format: str = "A string query, or an array of query strings"  # Instruction on what kind of input the tool expects with example
 
     def run(self, input_text: Any) -> str:
-            # Load Annoy index and TF-IDF vectorizer, perform RAG retrieval
-            import os
-            import pickle
-            import numpy as np
-            from annoy import AnnoyIndex
+        queries = [str(q).strip() for q in (input_text if isinstance(input_text, list) else [input_text]) if str(q).strip()]
+        if not queries:
+            return "Error: Query cannot be empty."
 
-            INDEX_PATH = os.path.join(os.path.dirname(__file__), "..", "RAG", "annoy_index")
-            annoy_index = AnnoyIndex(1000, metric='angular')
-            annoy_index.load(os.path.join(INDEX_PATH, "index.ann"))
-            with open(os.path.join(INDEX_PATH, "texts.pkl"), "rb") as f:
-                texts = pickle.load(f)
-            with open(os.path.join(INDEX_PATH, "vectorizer.pkl"), "rb") as f:
-                vectorizer = pickle.load(f)
+        # Loaded once per process and reused until the index is rebuilt
+        engine = get_engine()
+        if engine is None:
+            return "Error: RAG index not built. Run `python RAG/ragInit.py`."
 
-            # Embed the query
-            query_vec = vectorizer.transform([input_text]).toarray()[0].astype(np.float32)
-            idxs = annoy_index.get_nns_by_vector(query_vec, 4)
-            results = [texts[i] for i in idxs]
-            return "\n".join(results)
+        sections = []
+        for query, hits in zip(queries, engine.search(queries, k=RAG_RESULTS)):
+            passages = "\n".join(hit["text"] for hit in hits) or "No matching passages found."
+            sections.append(passages if len(queries) == 1 else f"Query: {query}\n{passages}")
+        return "\n\n".join(sections)
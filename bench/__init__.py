@@ -0,0 +1,4 @@
+"""Offline benchmark harness for the trip planning API.
+
+Run with `python -m bench.run_bench` from the project root.
+"""
@@ -0,0 +1,297 @@
+# bench/fakes.py
+# Offline stand-ins for Mapbox, DuckDuckGo search and the LLM, with injected latency.
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# Real coordinates for the cities used by the synthetic workload; anything else
+# gets a deterministic pseudo-location inside the continental US
+KNOWN_PLACES = {
+    "seattle, wa": (-122.3321, 47.6062),
+    "portland, or": (-122.6765, 45.5231),
+    "san francisco, ca": (-122.4194, 37.7749),
+    "los angeles, ca": (-118.2437, 34.0522),
+    "las vegas, nv": (-115.1398, 36.1699),
+    "phoenix, az": (-112.0740, 33.4484),
+    "flagstaff, az": (-111.6513, 35.1983),
+    "denver, co": (-104.9903, 39.7392),
+    "salt lake city, ut": (-111.8910, 40.7608),
+    "albuquerque, nm": (-106.6504, 35.0844),
+    "austin, tx": (-97.7431, 30.2672),
+    "chicago, il": (-87.6298, 41.8781),
+    "new york, ny": (-74.0060, 40.7128),
+    "boston, ma": (-71.0589, 42.3601),
+}
+
+
+def _sleep(latency_ms: float, jitter: float = 0.2) -> None:
+    if latency_ms > 0:
+        time.sleep(latency_ms / 1000 * random.uniform(1 - jitter, 1 + jitter))
+
+
+def fake_location(query: str) -> Optional[tuple]:
+    """Deterministic (lon, lat) for a query, or None for queries containing 'nowhere'."""
+    key = query.strip().casefold()
+    if "nowhere" in key:
+        return None
+    if key in KNOWN_PLACES:
+        return KNOWN_PLACES[key]
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    lon = -123 + (digest[0] * 256 + digest[1]) / 65535 * 52
+    lat = 30 + (digest[2] * 256 + digest[3]) / 65535 * 18
+    return round(lon, 5), round(lat, 5)
+
+
+def haversine_km(a: tuple, b: tuple) -> float:
+    lon1, lat1, lon2, lat2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(h))
+
+
+def fake_leg(a: tuple, b: tuple) -> dict:
+    # Road distance ~1.3x great-circle distance at an average of 95 km/h
+    distance_m = haversine_km(a, b) * 1300
+    return {"distance": distance_m, "duration": distance_m / 1000 / 95 * 3600}
+
+
+def _line(a: tuple, b: tuple, points: int = 50) -> list:
+    # Gently curved polyline so geometry simplification has something to remove
+    line = []
+    for i in range(points + 1):
+        t = i / points
+        wobble = 0.05 * math.sin(t * math.pi * 6)
+        line.append([a[0] + (b[0] - a[0]) * t + wobble, a[1] + (b[1] - a[1]) * t])
+    return line
+
+
+def _feature(query: str) -> list:
+    location = fake_location(query)
+    if location is None:
+        return []
+    return [{
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": list(location)},
+        "properties": {"name": query.split(",")[0].strip().title(), "place_formatted": query.strip()}
+    }]
+
+
+class FakeMapboxServer:
+    """Local HTTP server implementing the Mapbox endpoints the tools call.
+
+    Covers v6 forward and batch geocoding, v5 directions (with optional GeoJSON
+    geometry) and the v1 matrix API. Every response waits `latency_ms`.
+    Set MAPBOX_API_BASE to `server.base_url` before importing the backend.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, port: int = 0) -> None:
+        self.latency_ms = latency_ms
+        self.requests = {}
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, payload: dict, status: int = 200) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                fake._handle(self, "GET")
+
+            def do_POST(self):
+                fake._handle(self, "POST")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeMapboxServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+
+    def _handle(self, handler, method: str) -> None:
+        url = urlsplit(handler.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        _sleep(self.latency_ms)
+        if method == "GET" and url.path == "/search/geocode/v6/forward":
+            self._count("geocode")
+            handler._reply({"type": "FeatureCollection", "features": _feature(params.get("q", ""))})
+        elif method == "POST" and url.path == "/search/geocode/v6/batch":
+            self._count("geocode_batch")
+            length = int(handler.headers.get("Content-Length", 0))
+            queries = json.loads(handler.rfile.read(length) or b"[]")
+            handler._reply({"batch": [{"type": "FeatureCollection", "features": _feature(q.get("q", ""))} for q in queries]})
+        elif url.path.startswith("/directions/v5/"):
+            self._count("directions")
+            coords = [tuple(map(float, pair.split(","))) for pair in unquote(url.path.rsplit("/", 1)[1]).split(";")]
+            legs = [fake_leg(a, b) for a, b in zip(coords, coords[1:])]
+            route = {
+                "distance": sum(leg["distance"] for leg in legs),
+                "duration": sum(leg["duration"] for leg in legs),
+                "legs": legs
+            }
+            if params.get("geometries") == "geojson":
+                line = []
+                for a, b in zip(coords, coords[1:]):
+                    line.extend(_line(a, b)[1 if line else 0:])
+                route["geometry"] = {"type": "LineString", "coordinates": line}
+            handler._reply({"code": "Ok", "routes": [route]})
+        elif url.path.startswith("/directions-matrix/v1/"):
+            self._count("matrix")
+            coords = [tuple(map(float, pair.split(","))) for pair in unquote(url.path.rsplit("/", 1)[1]).split(";")]
+            sources = [int(i) for i in params["sources"].split(";")] if params.get("sources", "all") != "all" else list(range(len(coords)))
+            targets = [int(i) for i in params["destinations"].split(";")] if params.get("destinations", "all") != "all" else list(range(len(coords)))
+            legs = [[fake_leg(coords[s], coords[t]) for t in targets] for s in sources]
+            handler._reply({
+                "code": "Ok",
+                "durations": [[leg["duration"] for leg in row] for row in legs],
+                "distances": [[leg["distance"] for leg in row] for row in legs]
+            })
+        else:
+            handler._reply({"message": "Not Found"}, status=404)
+
+
+class FakeDDGS:
+    """Drop-in for ddgs.DDGS returning canned results after `latency_ms`."""
+
+    latency_ms = 0.0
+    calls = 0
+    fixtures: Optional[dict] = None  # query -> results, used when replaying
+    recorded: Optional[dict] = None  # filled when recording through a real DDGS
+    real_cls = None
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._real = FakeDDGS.real_cls(*args, **kwargs) if FakeDDGS.real_cls is not None else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def text(self, query: str, max_results: int = 10, **kwargs) -> list:
+        FakeDDGS.calls += 1
+        if self._real is not None:
+            results = self._real.text(query, max_results=max_results, **kwargs)
+            if FakeDDGS.recorded is not None:
+                FakeDDGS.recorded[query] = results
+            return results
+        if FakeDDGS.fixtures is not None and query in FakeDDGS.fixtures:
+            _sleep(FakeDDGS.latency_ms)
+            return FakeDDGS.fixtures[query][:max_results]
+        _sleep(FakeDDGS.latency_ms)
+        return [
+            {"title": f"{query} - result {i}", "href": f"https://example.com/{i}", "body": f"Synthetic search result {i} about {query}. " * 4}
+            for i in range(1, max_results + 1)
+        ]
+
+
+class FakeModel:
+    """Synthetic LLM: waits `latency_ms`, then answers with a well-formed itinerary.
+
+    It answers in one step (no tool calls), so tool traffic in synthetic runs
+    comes from the deterministic feasibility and stop-planning paths; record a
+    real run and replay it to benchmark full ReAct tool sequences. Stop-planning
+    prompts get a JSON list of stops and per-day prompts get just that day.
+    """
+
+    def __init__(self, latency_ms: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def chat_completion(self, messages, *args, **kwargs) -> str:
+        self.calls += 1
+        _sleep(self.latency_ms)
+        query = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        match = re.search(r"from (.+?) to (.+?)\. The trip will last (\d+)", str(query))
+        origin, destination, days = (match.group(1), match.group(2), int(match.group(3))) if match else ("A", "B", 2)
+        if "overnight stops" in str(query):
+            stops = [f"Stop {day} between {origin} and {destination}" for day in range(1, days)]
+            return "Thought: I have everything needed.\nFinal Answer: " + json.dumps(stops)
+        only_day = re.match(r"Day (\d+) of ", str(query))
+        start, end = fake_location(origin) or (0, 0), fake_location(destination) or (1, 1)
+        sections = []
+        for day in [int(only_day.group(1))] if only_day else range(1, days + 1):
+            a = [start[k] + (end[k] - start[k]) * (day - 1) / days for k in (0, 1)]
+            b = [start[k] + (end[k] - start[k]) * day / days for k in (0, 1)]
+            minutes = fake_leg(tuple(a), tuple(b))["duration"] / 60
+            sections.append(
+                f"Day {day}\n"
+                f"- Route: Stop {day - 1} → Stop {day}\n"
+                f"- Route Coordinates: [{a[0]:.4f},{a[1]:.4f};{b[0]:.4f},{b[1]:.4f}]\n"
+                f"- Driving: {minutes / 60:.1f} hours ({minutes:.0f} min), {minutes * 95 / 60:.0f} km\n"
+                f"- Start time suggestion: 8:00 AM\n"
+                f"- Attractions & Points of Interest:\n"
+                f"- Viewpoint {day} ({b[0]:.4f},{b[1]:.4f}): Synthetic attraction.\n"
+                f"- Notes: Synthetic day.\n"
+                f"- Overnight: Stop {day}"
+            )
+        return (
+            "Thought: I have everything needed.\nFinal Answer:\n\nDAY_SECTIONS:\n"
+            + "\n\n".join(sections)
+            + "\n\nSUMMARY_SECTIONS:\nEstimated total trip driving time\n- Total: synthetic\n\nNotes\n- Synthetic itinerary"
+        )
+
+
+class DelayedModel:
+    """Adds `latency_ms` to every completion of the wrapped model, e.g. to answers replayed from the LLM cache."""
+
+    def __init__(self, model, latency_ms: float = 0.0) -> None:
+        self._model = model
+        self.latency_ms = latency_ms
+
+    def __getattr__(self, name):
+        if name == "_model":
+            raise AttributeError(name)
+        return getattr(self._model, name)
+
+    def chat_completion(self, messages, *args, **kwargs) -> str:
+        _sleep(self.latency_ms)
+        return self._model.chat_completion(messages, *args, **kwargs)
+
+
+def load_fixtures(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            fixtures = json.load(f)
+    except FileNotFoundError:
+        fixtures = {}
+    fixtures.setdefault("ddgs", {})
+    return fixtures
+
+
+def save_fixtures(path: str, fixtures: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(fixtures, f, indent=1, sort_keys=True)
+
+
+__all__ = [
+    "DelayedModel", "FakeDDGS", "FakeMapboxServer", "FakeModel",
+    "fake_location", "load_fixtures", "save_fixtures"
+]
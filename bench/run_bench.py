@@ -0,0 +1,268 @@
+# bench/run_bench.py
+# Drive backend.backend:app with concurrent synthetic trips against offline stand-ins.
+#
+#   python -m bench.run_bench --trips 40 --concurrency 8 --output bench/results/$(git rev-parse --short HEAD).json
+#   python -m bench.run_bench --compare bench/results/<old>.json --output bench/results/<new>.json
+#
+# Record real LLM/DDGS traffic once (needs OPENAI_API_KEY and network), then replay it offline:
+#   python -m bench.run_bench --mode record --fixtures bench/fixtures/trips.json --llm-cache bench/fixtures/llm.sqlite --trips 4
+#   python -m bench.run_bench --mode replay --fixtures bench/fixtures/trips.json --llm-cache bench/fixtures/llm.sqlite
+# LLM completions are recorded and replayed by the backend's own LLM cache (backend/llm_cache.py).
+#
+# The usual backend env vars apply (e.g. PLAN_CACHE=0 to plan every repeated trip again).
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.fakes import DelayedModel, FakeDDGS, FakeMapboxServer, FakeModel, load_fixtures, save_fixtures
+
+TRIPS = [
+    ("Seattle, WA", "San Francisco, CA", 3, 6),
+    ("Los Angeles, CA", "Denver, CO", 3, 7),
+    ("Phoenix, AZ", "Salt Lake City, UT", 2, 6),
+    ("Portland, OR", "Las Vegas, NV", 3, 6),
+    ("Austin, TX", "Albuquerque, NM", 2, 7),
+    ("Chicago, IL", "New York, NY", 3, 5),
+    ("Flagstaff, AZ", "Boston, MA", 2, 4),  # not feasible
+]
+PREFERENCES = [["Natural Scenery"], ["Foodie", "City"], ["Culture"]]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile; 0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2) if samples else 0.0
+    }
+
+
+def install_fakes(args):
+    """Point the backend at the stand-ins; must run before backend modules are imported."""
+    server = FakeMapboxServer(latency_ms=args.mapbox_latency).start()
+    os.environ["MAPBOX_API_BASE"] = server.base_url
+    os.environ.setdefault("MAPBOX_ACCESS_TOKEN", "bench-token")
+    os.environ.setdefault("APP_PASSWORD", "bench")
+
+    fixtures = load_fixtures(args.fixtures) if args.mode in ("record", "replay") else {"ddgs": {}}
+    if args.mode == "record":
+        os.makedirs(os.path.dirname(os.path.abspath(args.llm_cache)), exist_ok=True)
+        os.environ["LLM_CACHE"], os.environ["LLM_CACHE_PATH"] = "record", args.llm_cache
+    elif args.mode == "replay" and args.replay_fallback:
+        # Unrecorded prompts are answered synthetically and cached in a copy, so the recording stays clean
+        copy = os.path.join(tempfile.mkdtemp(prefix="bench-llm-"), "llm.sqlite")
+        with sqlite3.connect(args.llm_cache) as source, sqlite3.connect(copy) as target:
+            source.backup(target)
+        os.environ["LLM_CACHE"], os.environ["LLM_CACHE_PATH"] = "cache", copy
+    elif args.mode == "replay":
+        os.environ["LLM_CACHE"], os.environ["LLM_CACHE_PATH"] = "replay", args.llm_cache
+    import backend.baseAgent
+    import backend.tools.ddgs_tool
+
+    if args.mode == "record":
+        FakeDDGS.real_cls = backend.tools.ddgs_tool.DDGS
+        FakeDDGS.recorded = fixtures["ddgs"]
+    elif args.mode == "replay":
+        FakeDDGS.fixtures = fixtures["ddgs"]
+        # Replayed answers come back instantly; the delay stands in for the model's latency
+        model = FakeModel()
+        backend.baseAgent.create_model = lambda **kwargs: model
+        real_cached_model = backend.baseAgent.cached_model
+        backend.baseAgent.cached_model = lambda inner, name: DelayedModel(real_cached_model(inner, name), args.llm_latency)
+    else:
+        model = FakeModel(args.llm_latency)
+        backend.baseAgent.create_model = lambda **kwargs: model
+
+    # Clients built before the swap (e.g. by an earlier import) would keep the real model
+    backend.baseAgent.reset_shared_models()
+    FakeDDGS.latency_ms = args.ddgs_latency
+    backend.tools.ddgs_tool.DDGS = FakeDDGS
+    return server, fixtures
+
+
+async def measure_loop_lag(samples, stop, interval=0.01):
+    # Time by which a short sleep overshoots = time the loop was blocked
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - start - interval))
+
+
+async def probe_light_endpoint(client, samples, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.post("/validate_password", json={"password": "bench"})
+        samples.setdefault("POST /validate_password", []).append(time.perf_counter() - start)
+        await asyncio.sleep(0.1)
+
+
+async def run_trip(client, trip_index, samples, outcomes, poll_interval):
+    from_loc, to_loc, duration, hours = TRIPS[trip_index % len(TRIPS)]
+    relaxed = trip_index % 2 == 1
+    trip = {"from": from_loc, "to": to_loc, "duration": duration, "drivingHoursPerDay": hours}
+    if relaxed:
+        trip["preferences"] = PREFERENCES[trip_index % len(PREFERENCES)]
+        endpoint = "/plan_relaxed_trip"
+    else:
+        trip["routePreference"] = "Yes"
+        endpoint = "/plan_trip"
+
+    started = time.perf_counter()
+    response = await client.post(endpoint, json={"trip": trip})
+    samples.setdefault(f"POST {endpoint}", []).append(time.perf_counter() - started)
+    if response.status_code != 200:
+        outcomes[f"http_{response.status_code}"] = outcomes.get(f"http_{response.status_code}", 0) + 1
+        return
+    data = response.json()
+    if not data.get("feasible"):
+        outcomes["not_feasible"] = outcomes.get("not_feasible", 0) + 1
+        return
+
+    while True:
+        await asyncio.sleep(poll_interval)
+        poll_start = time.perf_counter()
+        status = (await client.get(f"/job_status/{data['job_id']}")).json()
+        samples.setdefault("GET /job_status", []).append(time.perf_counter() - poll_start)
+        if status["status"] != "processing":
+            break
+    samples.setdefault("trip end-to-end", []).append(time.perf_counter() - started)
+    outcomes[status["status"]] = outcomes.get(status["status"], 0) + 1
+
+
+async def run_workload(args):
+    import httpx
+    from backend.backend import app
+
+    samples, outcomes, lag = {}, {}, []
+    stop = asyncio.Event()
+    trip_numbers = itertools.count()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        async def user():
+            while (index := next(trip_numbers)) < args.trips:
+                await run_trip(client, index, samples, outcomes, args.poll_interval)
+
+        background = [asyncio.create_task(measure_loop_lag(lag, stop)),
+                      asyncio.create_task(probe_light_endpoint(client, samples, stop))]
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*background)
+    return samples, outcomes, lag, elapsed
+
+
+def collect_results(args, samples, outcomes, lag, elapsed, server):
+    from backend.cache import cache_stats
+    from backend.instrumentation import tool_call_seconds, llm_call_seconds
+
+    tool_calls = {}
+    for labels, snap in tool_call_seconds.samples():
+        total = tool_calls.setdefault(labels["tool"], {"count": 0, "sum": 0.0})
+        total["count"] += snap["count"]
+        total["sum"] += snap["sum"]
+
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    completed = outcomes.get("completed", 0)
+    return {
+        "commit": commit or "unknown",
+        "config": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+        "elapsed_s": round(elapsed, 3),
+        "throughput_trips_per_s": round(args.trips / elapsed, 3),
+        "completed_per_s": round(completed / elapsed, 3),
+        "outcomes": outcomes,
+        "endpoints": {name: latency_summary(values) for name, values in sorted(samples.items())},
+        "event_loop_lag": latency_summary(lag),
+        "tool_calls": tool_calls,
+        "llm_calls": sum(snap["count"] for _, snap in llm_call_seconds.samples()),
+        "mapbox_requests": dict(server.requests),
+        "ddgs_requests": FakeDDGS.calls,
+        "caches": cache_stats()
+    }
+
+
+def print_report(results, baseline=None):
+    def delta(path):
+        if baseline is None:
+            return ""
+        old, new = baseline, results
+        for key in path:
+            old = old.get(key, {}) if isinstance(old, dict) else {}
+            new = new.get(key, {}) if isinstance(new, dict) else {}
+        if not isinstance(old, (int, float)) or not old:
+            return ""
+        return f"  ({(new - old) / old:+.1%} vs {baseline['commit']})"
+
+    print(f"commit {results['commit']}: {results['config']['trips']} trips, concurrency {results['config']['concurrency']}, mode {results['config']['mode']}")
+    print(f"throughput: {results['throughput_trips_per_s']} trips/s{delta(['throughput_trips_per_s'])}")
+    print(f"outcomes: {results['outcomes']}")
+    print(f"{'endpoint':<28}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, summary in results["endpoints"].items():
+        print(f"{name:<28}{summary['count']:>7}{summary['p50_ms']:>10}{summary['p95_ms']:>10}{summary['p99_ms']:>10}{delta(['endpoints', name, 'p99_ms'])}")
+    lag = results["event_loop_lag"]
+    print(f"event loop lag: p50 {lag['p50_ms']} ms, p99 {lag['p99_ms']} ms, max {lag['max_ms']} ms{delta(['event_loop_lag', 'p99_ms'])}")
+    print(f"llm calls: {results['llm_calls']}{delta(['llm_calls'])}; ddgs requests: {results['ddgs_requests']}")
+    print(f"mapbox requests: {results['mapbox_requests']}")
+    for tool, snap in sorted(results["tool_calls"].items()):
+        print(f"tool {tool}: {snap['count']} calls, {snap['sum'] * 1000 / snap['count']:.1f} ms avg{delta(['tool_calls', tool, 'count'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline latency/throughput benchmark for the trip planning API.")
+    parser.add_argument("--trips", type=int, default=20, help="total trip requests")
+    parser.add_argument("--concurrency", type=int, default=5, help="concurrent virtual users")
+    parser.add_argument("--mode", choices=("synthetic", "record", "replay"), default="synthetic")
+    parser.add_argument("--fixtures", default=os.path.join(os.path.dirname(__file__), "fixtures", "trips.json"))
+    parser.add_argument("--llm-cache", default=os.path.join(os.path.dirname(__file__), "fixtures", "llm.sqlite"),
+                        help="LLM_CACHE_PATH holding recorded completions (record / replay)")
+    parser.add_argument("--replay-fallback", action="store_true", help="answer unrecorded prompts synthetically instead of failing")
+    parser.add_argument("--mapbox-latency", type=float, default=60.0, help="ms per Mapbox request")
+    parser.add_argument("--ddgs-latency", type=float, default=400.0, help="ms per search")
+    parser.add_argument("--llm-latency", type=float, default=1500.0, help="ms per LLM completion")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="seconds between /job_status polls")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="results JSON from another commit to diff against")
+    args = parser.parse_args(argv)
+
+    server, fixtures = install_fakes(args)
+    try:
+        samples, outcomes, lag, elapsed = asyncio.run(run_workload(args))
+        results = collect_results(args, samples, outcomes, lag, elapsed, server)
+    finally:
+        server.stop()
+
+    if args.mode == "record":
+        os.makedirs(os.path.dirname(os.path.abspath(args.fixtures)), exist_ok=True)
+        save_fixtures(args.fixtures, fixtures)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,7 @@ import toast, { Toaster } from 'react-hot-toast';
 import PasswordScreen from './components/PasswordScreen';
 import TripForm from './components/TripForm';
 import ItineraryDisplay from './components/ItineraryDisplay';
+import { usePolling } from './hooks/usePolling';
 
 // Use VITE_API_BASE_URL for API calls
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || "http://localhost:8000";
@@ -13,10 +14,54 @@ function App() {
   const [authenticated, setAuthenticated] = useState(false);
   const [result, setResult] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [progress, setProgress] = useState(null);
+  const [itinerary, setItinerary] = useState(null);
+  const [jobId, setJobId] = useState(null);
+
+  const describeStep = (step) => {
+    if (step.type === 'tool_call') {
+      const labels = {
+        geocode_addresses: 'Looking up locations',
+        get_directions: 'Calculating driving routes',
+        search_text: 'Researching stops',
+      };
+      const label = labels[step.tool] || `Running ${step.tool}`;
+      // Steps from the per-day agents say which day they belong to
+      return step.day ? `${label} for day ${step.day}` : label;
+    }
+    return null;
+  };
+
+  const { startPolling } = usePolling(
+    API_BASE_URL,
+    (jobResult) => {
+      toast.success('Trip itinerary generated successfully!');
+      // Structured days when the backend could parse the answer, raw text otherwise
+      setItinerary(jobResult.itinerary && jobResult.itinerary.days.length > 0 ? jobResult.itinerary : null);
+      setResult(jobResult.answer || '');
+      setProgress(null);
+      setLoading(false);
+    },
+    (error) => {
+      toast.error('Error generating itinerary: ' + error);
+      setResult('Error: ' + error);
+      setProgress(null);
+      setLoading(false);
+    },
+    2000,
+    (step) => setProgress(describeStep(step)),
+    (day) => setItinerary((current) => ({
+      days: [...(current ? current.days : []), day],
+      summary: current ? current.summary : []
+    }))
+  );
 
   const handleFormSubmit = async (tripData) => {
     setLoading(true);
     setResult(null);
+    setProgress(null);
+    setItinerary(null);
+    setJobId(null);
     
     toast.success('Planning your trip... This may take a few moments.', {
       duration: 3000,
@@ -31,6 +76,14 @@ function App() {
       });
       const data = await res.json();
 
+      if (!res.ok) {
+        // 503 when the server's agent queue is full, 504 when the route check times out
+        toast.error('Failed to start trip planning: ' + data.detail);
+        setResult('Error: ' + data.detail);
+        setLoading(false);
+        return;
+      }
+
       if (!data.feasible) {
         toast.error('Route not feasible: ' + data.answer);
         setResult(data.answer);
@@ -38,30 +91,9 @@ function App() {
         return;
       }
 
-      // Poll for job status
-      const jobId = data.job_id;
-      const pollInterval = setInterval(async () => {
-        try {
-          const statusRes = await fetch(`${API_BASE_URL}/job_status/${jobId}`);
-          const statusData = await statusRes.json();
-          if (statusData.status === "completed") {
-            clearInterval(pollInterval);
-            toast.success('Trip itinerary generated successfully!');
-            setResult(statusData.result.answer);
-            setLoading(false);
-          } else if (statusData.status === "error") {
-            clearInterval(pollInterval);
-            toast.error('Error generating itinerary: ' + statusData.result);
-            setResult('Error: ' + statusData.result);
-            setLoading(false);
-          }
-        } catch (pollErr) {
-          clearInterval(pollInterval);
-          toast.error('Connection error while generating itinerary');
-          setResult('Error polling status: ' + pollErr.message);
-          setLoading(false);
-        }
-      }, 2000);
+      // Follow job progress (server push, with polling fallback)
+      setJobId(data.job_id);
+      startPolling(data.job_id);
     } catch (err) {
       toast.error('Failed to start trip planning: ' + err.message);
       setResult('Error: ' + err.message);
@@ -79,7 +111,11 @@ function App() {
 
       <TripForm onSubmit={handleFormSubmit} loading={loading} />
 
-      {result && <ItineraryDisplay content={result} />}
+      {loading && progress && (
+        <p className="mt-4 text-center text-sm text-gray-500 dark:text-gray-400">{progress}...</p>
+      )}
+
+      {(result !== null || itinerary) && <ItineraryDisplay content={result || ''} itinerary={itinerary} apiBaseUrl={API_BASE_URL} jobId={loading ? null : jobId} />}
       
       <Toaster 
         position="top-right"
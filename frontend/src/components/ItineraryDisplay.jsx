@@ -1,13 +1,14 @@
 import React, { useState } from 'react';
 import RouteMap from './RouteMap';
 
-const ItineraryDisplay = ({ content }) => {
+const ItineraryDisplay = ({ content = '', itinerary = null, apiBaseUrl = null, jobId = null }) => {
   // Carousel state
   const [currentDayIndex, setCurrentDayIndex] = useState(0);
   const [currentPOIIndex, setCurrentPOIIndex] = useState(0);
 
-  // Check if this is an itinerary (contains "Day" headers) or just a message
-  const isItinerary = content.includes('Day ') && (
+  // Structured days from the backend need no parsing; otherwise check if the text
+  // is an itinerary (contains "Day" headers) or just a message
+  const isItinerary = Boolean(itinerary && itinerary.days.length > 0) || content.includes('Day ') && (
     content.includes('Route:') ||
     content.includes('Driving:') ||
     content.includes('- Route:') ||
@@ -202,13 +203,34 @@ const ItineraryDisplay = ({ content }) => {
     return sections;
   };
 
+  // Map a day parsed by the backend onto the shape parseDayContent produces
+  const fromStructuredDay = (day) => {
+    const overnightDetails = [];
+    if (day.accommodation) overnightDetails.push(`Accommodation options: ${day.accommodation}`);
+    if (day.dining) overnightDetails.push(`Dining options: ${day.dining}`);
+    if (day.why) overnightDetails.push(`Why ${day.overnight || 'here'}: ${day.why}`);
+    return {
+      route: day.route,
+      routeCoordinates: day.route_coordinates.length > 1
+        ? `[${day.route_coordinates.map(([lon, lat]) => `${lon},${lat}`).join(';')}]`
+        : undefined,
+      driving: day.driving,
+      startTime: day.start_time,
+      notes: day.notes,
+      overnight: day.overnight ? { city: day.overnight, details: overnightDetails } : undefined,
+      other: day.other,
+      pois: day.pois.map((poi) => ({
+        name: poi.name,
+        coordinates: [poi.lat, poi.lon], // Leaflet uses [lat, lng]
+        description: poi.description
+      }))
+    };
+  };
+
   // Render structured day content
-  const renderDayContent = (content) => {
-    const parsed = parseDayContent(content);
-    const pois = parseAttractions(parsed.attractions);
-    console.log('ItineraryDisplay Debug - parsed.attractions:', parsed.attractions);
-    console.log('ItineraryDisplay Debug - pois:', pois);
-    console.log('ItineraryDisplay Debug:', { parsed, pois });
+  const renderDayContent = (section) => {
+    const parsed = section.data ? fromStructuredDay(section.data) : parseDayContent(section.content);
+    const pois = parsed.pois || parseAttractions(parsed.attractions);
     return (
       <div className="space-y-4">
         {parsed.route && (
@@ -295,6 +317,9 @@ const ItineraryDisplay = ({ content }) => {
                   pois={pois}
                   currentPOIIndex={currentPOIIndex}
                   onPOIChange={setCurrentPOIIndex}
+                  apiBaseUrl={apiBaseUrl}
+                  jobId={jobId}
+                  day={section.dayNumber}
                   className="w-full"
                 />
               </>
@@ -477,7 +502,16 @@ const ItineraryDisplay = ({ content }) => {
     });
   };
 
-  const sections = parseItinerary(content);
+  const sections = itinerary && itinerary.days.length > 0
+    ? [
+        ...itinerary.days.map((day) => ({ type: 'day', title: `Day ${day.day}`, dayNumber: day.day, data: day })),
+        ...(itinerary.summary || []).map((section) => ({
+          type: 'summary',
+          title: section.title,
+          content: section.items.map((item) => `- ${item}`).join('\n')
+        }))
+      ]
+    : parseItinerary(content);
 
   // Separate day and summary sections
   const daySections = sections.filter(section => section.type === 'day');
@@ -560,7 +594,7 @@ const ItineraryDisplay = ({ content }) => {
             </div>
 
             <div className="text-gray-700 dark:text-gray-300 text-sm leading-relaxed">
-              {renderDayContent(daySections[currentDayIndex].content)}
+              {renderDayContent(daySections[currentDayIndex])}
             </div>
           </div>
         </div>
@@ -1,5 +1,5 @@
-import React, { useRef, useEffect } from 'react';
-import { MapContainer, TileLayer, Polyline, Marker, Popup, Tooltip } from 'react-leaflet';
+import React, { useRef, useEffect, useMemo, useState } from 'react';
+import { MapContainer, TileLayer, Polyline, Marker, Popup, Tooltip, useMap, useMapEvents } from 'react-leaflet';
 import 'leaflet/dist/leaflet.css';
 
 // Fix for default markers in react-leaflet
@@ -35,14 +35,54 @@ const createNumberedIcon = (number, isActive = false) => {
   });
 };
 
+// Decode a Google encoded polyline into Leaflet [lat, lng] pairs
+const decodePolyline = (encoded, precision = 5) => {
+  const factor = 10 ** precision;
+  const points = [];
+  let index = 0;
+  let lat = 0;
+  let lng = 0;
+  while (index < encoded.length) {
+    const deltas = [];
+    for (let i = 0; i < 2; i++) {
+      let result = 0;
+      let shift = 0;
+      let byte;
+      do {
+        byte = encoded.charCodeAt(index++) - 63;
+        result |= (byte & 0x1f) << shift;
+        shift += 5;
+      } while (byte >= 0x20);
+      deltas.push(result & 1 ? ~(result >> 1) : result >> 1);
+    }
+    lat += deltas[0];
+    lng += deltas[1];
+    points.push([lat / factor, lng / factor]);
+  }
+  return points;
+};
+
+// Reports the map's zoom level so the matching simplified route line can be drawn
+const ZoomWatcher = ({ onZoom }) => {
+  const map = useMap();
+  useEffect(() => onZoom(map.getZoom()), [map]);
+  useMapEvents({ zoomend: (event) => onZoom(event.target.getZoom()) });
+  return null;
+};
+
 const RouteMap = ({ 
   routeCoordinates, 
   pois = [], 
   className = "",
   currentPOIIndex = 0,
-  onPOIChange = () => {}
+  onPOIChange = () => {},
+  apiBaseUrl = null,
+  jobId = null,
+  day = null
 }) => {
   const mapRef = useRef(null);
+  const [geometry, setGeometry] = useState(null);
+  const [zoom, setZoom] = useState(null);
   
   // Parse coordinates from the route string format: "[-122.3321,47.6062;-122.9007,47.0379]"
   const parseCoordinates = (coordString) => {
@@ -82,6 +122,26 @@ const RouteMap = ({
   const center = getMapCenter();
   const bounds = getMapBounds();
 
+  // Road geometry comes from the backend, pre-simplified for each zoom level; it is
+  // only served for days of finished jobs, so streamed days get their line at the end
+  useEffect(() => {
+    setGeometry(null);
+    if (!apiBaseUrl || !jobId || day === null || !coordinates || coordinates.length < 2) return;
+    let cancelled = false;
+    fetch(`${apiBaseUrl}/route_geometry?job_id=${encodeURIComponent(jobId)}&day=${day}`)
+      .then((res) => (res.ok ? res.json() : null))
+      .then((data) => { if (!cancelled) setGeometry(data); })
+      .catch((error) => console.error('Error loading route geometry:', error));
+    return () => { cancelled = true; };
+  }, [apiBaseUrl, jobId, day, routeCoordinates]);
+
+  const routeLine = useMemo(() => {
+    if (!geometry || geometry.levels.length === 0) return null;
+    const suited = geometry.levels.filter((level) => zoom === null || level.zoom <= zoom);
+    const level = suited.length > 0 ? suited[suited.length - 1] : geometry.levels[0];
+    return decodePolyline(level.polyline);
+  }, [geometry, zoom]);
+
   // Center map on POI when currentPOIIndex changes
   useEffect(() => {
     if (mapRef.current && pois[currentPOIIndex]) {
@@ -126,6 +186,12 @@ const RouteMap = ({
           url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
         />
 
+        <ZoomWatcher onZoom={setZoom} />
+
+        {routeLine && (
+          <Polyline positions={routeLine} pathOptions={{ color: '#3b82f6', weight: 4, opacity: 0.8 }} />
+        )}
+
         {/* Start and end markers */}
         {coordinates && coordinates.length >= 2 && (
           <>
@@ -1,22 +1,36 @@
 import { useEffect, useRef } from 'react';
 
-export function usePolling(apiBaseUrl, onComplete, onError, interval = 2000) {
+// Follows a job's progress. Uses the /job_events Server-Sent Events stream and
+// falls back to polling /job_status when EventSource is unavailable or the
+// stream drops before the job finishes. onDay receives each itinerary day as
+// soon as the per-day pipeline has finished it.
+export function usePolling(apiBaseUrl, onComplete, onError, interval = 2000, onStep = () => {}, onDay = () => {}) {
   const intervalRef = useRef(null);
+  const eventSourceRef = useRef(null);
   const jobIdRef = useRef(null);
 
-  const startPolling = (jobId) => {
-    jobIdRef.current = jobId;
+  const handleStatus = (statusData) => {
+    if (statusData.status === "completed") {
+      stopPolling();
+      onComplete(statusData.result);
+    } else if (statusData.status === "error") {
+      stopPolling();
+      onError(statusData.result);
+    } else if (statusData.status === "cancelled") {
+      // Called off by the server, e.g. a speculative plan for a trip that turned out infeasible
+      stopPolling();
+      onError(statusData.result || 'Trip planning was cancelled');
+    } else if (statusData.status === "not_found") {
+      stopPolling();
+      onError('Job not found');
+    }
+  };
+
+  const pollStatus = (jobId) => {
     intervalRef.current = setInterval(async () => {
       try {
         const statusRes = await fetch(`${apiBaseUrl}/job_status/${jobId}`);
-        const statusData = await statusRes.json();
-        if (statusData.status === "completed") {
-          stopPolling();
-          onComplete(statusData.result);
-        } else if (statusData.status === "error") {
-          stopPolling();
-          onError(statusData.result);
-        }
+        handleStatus(await statusRes.json());
       } catch (pollErr) {
         stopPolling();
         onError(`Error polling status: ${pollErr.message}`);
@@ -24,11 +38,38 @@ export function usePolling(apiBaseUrl, onComplete, onError, interval = 2000) {
     }, interval);
   };
 
+  const startPolling = (jobId) => {
+    stopPolling();
+    jobIdRef.current = jobId;
+    if (typeof EventSource === 'undefined') {
+      pollStatus(jobId);
+      return;
+    }
+
+    const source = new EventSource(`${apiBaseUrl}/job_events/${jobId}`);
+    eventSourceRef.current = source;
+    source.addEventListener('status', (event) => handleStatus(JSON.parse(event.data)));
+    source.addEventListener('step', (event) => onStep(JSON.parse(event.data)));
+    source.addEventListener('day', (event) => onDay(JSON.parse(event.data)));
+    source.onerror = () => {
+      // Stream dropped before a final status: continue with plain polling
+      if (eventSourceRef.current === source) {
+        source.close();
+        eventSourceRef.current = null;
+        pollStatus(jobId);
+      }
+    };
+  };
+
   const stopPolling = () => {
     if (intervalRef.current) {
       clearInterval(intervalRef.current);
       intervalRef.current = null;
     }
+    if (eventSourceRef.current) {
+      eventSourceRef.current.close();
+      eventSourceRef.current = null;
+    }
   };
 
   useEffect(() => {
@@ -36,4 +77,4 @@ export function usePolling(apiBaseUrl, onComplete, onError, interval = 2000) {
   }, []);
 
   return { startPolling, stopPolling };
-}
\ No newline at end of file
+}